@@ -1,5 +1,11 @@
+import os
+import warnings
 import pandas as pd
-from collections import defaultdict, Counter
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from prioritization_tool.logic.parse_cache import cached_parse
+from prioritization_tool.logic.row_registry import RowAccumulator
 
 # Матрица Кано: пары функционального и дисфункционального ответа → категория
 KANO_MATRIX = {
@@ -28,33 +34,108 @@ CATEGORY_WEIGHTS = {
     "Questionable": 0.0
 }
 
-def process_kano_csv(filepath):
-    df = pd.read_csv(filepath)
-    required_cols = {"Альтернатива", "Стейкхолдер", "Функциональный", "Дисфункциональный", "Вес"}
-    if not required_cols.issubset(df.columns):
+# Плотное представление матрицы: коды ответов (последний — неизвестный ответ) → код категории
+KANO_ANSWERS = ["Attractive", "Must-be", "Indifferent", "Reverse"]
+KANO_CATEGORIES = list(CATEGORY_WEIGHTS)
+ANSWER_CODES = {answer: code for code, answer in enumerate(KANO_ANSWERS)}
+UNKNOWN_ANSWER = len(KANO_ANSWERS)
+QUESTIONABLE = KANO_CATEGORIES.index("Questionable")
+
+
+def build_kano_lookup():
+    """Таблица (ответы + 1) × (ответы + 1) кодов категорий; отсутствующие пары — Questionable"""
+    lookup = np.full((len(KANO_ANSWERS) + 1, len(KANO_ANSWERS) + 1), QUESTIONABLE, dtype=np.int64)
+    for (functional, dysfunctional), category in KANO_MATRIX.items():
+        lookup[ANSWER_CODES[functional], ANSWER_CODES[dysfunctional]] = KANO_CATEGORIES.index(category)
+    return lookup
+
+
+KANO_LOOKUP = build_kano_lookup()
+CATEGORY_WEIGHT_VECTOR = np.array([CATEGORY_WEIGHTS[cat] for cat in KANO_CATEGORIES])
+
+
+def encode_answers(values):
+    """Коды ответов Кано; каждое уникальное значение сопоставляется один раз"""
+    value_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    unique_codes = np.array([ANSWER_CODES.get(u, UNKNOWN_ANSWER) for u in uniques], dtype=np.int64)
+    return unique_codes[value_codes]
+
+
+def classify_responses(functional, dysfunctional):
+    """Коды категорий (индексы KANO_CATEGORIES) для всех ответов одним обращением к таблице"""
+    return classify_codes(encode_answers(functional), encode_answers(dysfunctional))
+
+
+def classify_codes(functional_codes, dysfunctional_codes):
+    """Коды категорий по кодам ответов encode_answers"""
+    return KANO_LOOKUP[functional_codes, dysfunctional_codes]
+
+
+def category_distribution(groups, categories, weights, n_groups):
+    """
+    Взвешенное распределение категорий по группам (группы, категории) одной
+    сверткой bincount, число ответов каждой пары и номер ее первой строки
+    (-1 — пара не встречалась).
+    """
+    n_cat = len(KANO_CATEGORIES)
+    cells = np.asarray(groups, dtype=np.int64) * n_cat + categories
+    totals = np.bincount(cells, weights=weights, minlength=n_groups * n_cat).reshape(n_groups, n_cat)
+    counts = np.bincount(cells, minlength=n_groups * n_cat).reshape(n_groups, n_cat)
+
+    first_row = np.full(n_groups * n_cat, len(cells), dtype=np.int64)
+    np.minimum.at(first_row, cells, np.arange(len(cells)))
+    first_row[first_row == len(cells)] = -1
+    return totals, counts, first_row.reshape(n_groups, n_cat)
+
+
+REQUIRED_COLS = {"Альтернатива", "Стейкхолдер", "Функциональный", "Дисфункциональный", "Вес"}
+
+
+def _response_arrays(df):
+    if not REQUIRED_COLS.issubset(df.columns):
         raise ValueError("CSV должен содержать колонки: Альтернатива, Стейкхолдер, Функциональный, Дисфункциональный, Вес")
 
-    results = defaultdict(list)
+    # Строки хранятся кодами: имена — только уникальные, ответы — коды encode_answers
+    alt_codes, alternatives = pd.factorize(df["Альтернатива"].astype(str))
+    stake_codes, stakeholders = pd.factorize(df["Стейкхолдер"].astype(str))
+    return {
+        "alternative_codes": alt_codes.astype(np.int32),
+        "alternatives": np.asarray(alternatives, dtype=str),
+        "stakeholder_codes": stake_codes.astype(np.int32),
+        "stakeholders": np.asarray(stakeholders, dtype=str),
+        "functional": encode_answers(df["Функциональный"].astype(str).str.strip().to_numpy()).astype(np.int8),
+        "dysfunctional": encode_answers(df["Дисфункциональный"].astype(str).str.strip().to_numpy()).astype(np.int8),
+        "weights": df["Вес"].astype(float).to_numpy(),
+    }
+
+
+def _load_kano_responses(filepath):
+    return _response_arrays(pd.read_csv(filepath))
+
 
-    for _, row in df.iterrows():
-        alt = row["Альтернатива"]
-        f = str(row["Функциональный"]).strip()
-        d = str(row["Дисфункциональный"]).strip()
-        weight = float(row["Вес"])
+def load_kano_responses(filepath):
+    """
+    Ответы анкеты Кано через кэш разбора: коды строк 'alternative_codes' и
+    'stakeholder_codes' с уникальными именами 'alternatives' и 'stakeholders'
+    (в порядке первого появления), коды ответов 'functional' и 'dysfunctional'
+    (encode_answers) и веса 'weights' по строкам файла
+    """
+    # Версия 2: вместо строковых столбцов хранятся коды
+    return cached_parse("kano.responses", filepath, _load_kano_responses, version=2)
 
-        category = KANO_MATRIX.get((f, d), "Questionable")
-        results[alt].append((category, weight))
 
+def kano_results(alternatives, totals, first_row):
+    """Итоговые distribution/score по гистограмме (альтернативы, категории)"""
     final = {}
 
-    for alt, votes in results.items():
-        counter = Counter()
-        for cat, w in votes:
-            counter[cat] += w
+    for a, alt in enumerate(alternatives):
+        # Категории в порядке первого появления у альтернативы
+        present = np.flatnonzero(first_row[a] >= 0)
+        present = present[np.argsort(first_row[a, present])]
+        distribution = {KANO_CATEGORIES[c]: float(totals[a, c]) for c in present}
 
-        distribution = dict(counter)
-        weighted_priority = sum(CATEGORY_WEIGHTS.get(cat, 0) * weight for cat, weight in counter.items())
-        score = round((weighted_priority / sum(counter.values())) * 100, 2) if counter else 0.0
+        weighted_priority = sum(CATEGORY_WEIGHTS.get(cat, 0) * weight for cat, weight in distribution.items())
+        score = round((weighted_priority / sum(distribution.values())) * 100, 2) if distribution else 0.0
 
         final[alt] = {
             "distribution": distribution,
@@ -63,3 +144,246 @@ def process_kano_csv(filepath):
         }
 
     return final
+
+
+def process_kano_csv(filepath):
+    responses = load_kano_responses(filepath)
+
+    alternatives = responses["alternatives"].tolist()
+    categories = classify_codes(responses["functional"], responses["dysfunctional"])
+    totals, _, first_row = category_distribution(responses["alternative_codes"], categories,
+                                                 responses["weights"], len(alternatives))
+
+    return kano_results(alternatives, totals, first_row)
+
+
+class KanoHistogram(RowAccumulator):
+    """
+    Компактный агрегат анкеты Кано: взвешенная гистограмма
+    (альтернативы, категории), число ответов и номер первой строки каждой пары,
+    задающий порядок ключей distribution. Накапливается порциями CSV,
+    сериализуется в словарь массивов и объединяется с агрегатами
+    других выгрузок так, как если бы файлы были склеены по порядку.
+    """
+
+    def __init__(self):
+        super().__init__()
+        n_cat = len(KANO_CATEGORIES)
+        self._registry.add_array("totals", (n_cat,))
+        self._registry.add_array("counts", (n_cat,), fill=0, dtype=np.int64)
+        self._registry.add_array("first_row", (n_cat,), fill=-1, dtype=np.int64)
+        self.rows = 0
+
+    @property
+    def totals(self):
+        return self._registry["totals"]
+
+    @property
+    def counts(self):
+        return self._registry["counts"]
+
+    @property
+    def first_row(self):
+        return self._registry["first_row"]
+
+    @classmethod
+    def from_csv(cls, filepath):
+        """Гистограмма целого файла через кэш разбора"""
+        return cls().update_arrays(load_kano_responses(filepath))
+
+    def update(self, df):
+        """Добавление порции строк исходного CSV"""
+        return self.update_arrays(_response_arrays(df))
+
+    def update_arrays(self, responses):
+        """Добавление ответов в формате load_kano_responses"""
+        alt_codes = responses["alternative_codes"]
+        rows = self._alternative_rows(responses["alternatives"].tolist())[alt_codes]
+        categories = classify_codes(responses["functional"], responses["dysfunctional"])
+
+        totals, counts, first_row = category_distribution(rows, categories, responses["weights"],
+                                                          len(self._registry))
+        self._add(totals, counts, first_row, len(alt_codes))
+        return self
+
+    def merge(self, other):
+        """Объединение с агрегатом следующей выгрузки (на месте)"""
+        rows = self._alternative_rows(other.alternatives)
+        totals = np.zeros_like(self.totals)
+        counts = np.zeros_like(self.counts)
+        first_row = np.full_like(self.first_row, -1)
+        totals[rows] = other.totals
+        counts[rows] = other.counts
+        first_row[rows] = other.first_row
+        self._add(totals, counts, first_row, other.rows)
+        return self
+
+    def to_arrays(self):
+        """Сериализуемое представление (например, для np.savez)"""
+        arrays = self._registry.to_arrays()
+        arrays["rows"] = np.array(self.rows, dtype=np.int64)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Восстановление агрегата из to_arrays()"""
+        histogram = cls()
+        histogram._registry.restore(arrays)
+        histogram.rows = int(arrays["rows"])
+        return histogram
+
+    def results(self):
+        """Итоговые оценки в формате process_kano_csv"""
+        return kano_results(self.alternatives, self.totals, self.first_row)
+
+    def _add(self, totals, counts, first_row, n_rows):
+        # Номера строк добавляемой части сдвигаются на число уже учтенных строк
+        shifted = np.where(first_row >= 0, first_row + self.rows, -1)
+        self._registry["first_row"] = np.where(self.first_row >= 0, self.first_row, shifted)
+        self.totals[:] += totals
+        self.counts[:] += counts
+        self.rows += n_rows
+
+
+def accumulate_kano_csv(filepath, chunksize=100_000):
+    """Потоковое накопление гистограммы по CSV порциями по chunksize строк"""
+    histogram = KanoHistogram()
+    for chunk in pd.read_csv(filepath, chunksize=chunksize):
+        histogram.update(chunk)
+    return histogram
+
+
+def process_kano_csv_streaming(filepaths, chunksize=100_000, workers=None):
+    """
+    Потоковая обработка одной или нескольких выгрузок анкеты. Несколько файлов
+    обрабатываются параллельно в пуле процессов, их гистограммы объединяются
+    в порядке перечисления — результат совпадает с обработкой склеенного файла.
+    """
+    if isinstance(filepaths, (str, os.PathLike)):
+        filepaths = [filepaths]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(filepaths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(filepaths))) as pool:
+            parts = list(pool.map(accumulate_kano_csv, filepaths, [chunksize] * len(filepaths)))
+    else:
+        parts = [accumulate_kano_csv(path, chunksize) for path in filepaths]
+
+    histogram = KanoHistogram()
+    for part in parts:
+        histogram.merge(part)
+    return histogram.results()
+
+
+# ===================== КОЭФФИЦИЕНТЫ BETTER / WORSE =====================
+
+_A, _O, _M, _I = (KANO_CATEGORIES.index(cat) for cat in ("Attractive", "One-dimensional", "Must-be", "Indifferent"))
+
+
+def better_worse(totals):
+    """
+    Коэффициенты удовлетворенности по гистограммам (..., категории):
+    Better = (A + O) / (A + O + M + I), Worse = −(O + M) / (A + O + M + I).
+    Для пустого знаменателя — NaN.
+    """
+    base = totals[..., _A] + totals[..., _O] + totals[..., _M] + totals[..., _I]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        better = np.where(base > 0, (totals[..., _A] + totals[..., _O]) / base, np.nan)
+        worse = np.where(base > 0, -(totals[..., _O] + totals[..., _M]) / base, np.nan)
+    return better, worse
+
+
+def better_worse_quadrant(better, worse, threshold=0.5):
+    """Категория по квадранту диаграммы Better/Worse"""
+    if better >= threshold:
+        return "One-dimensional" if abs(worse) >= threshold else "Attractive"
+    return "Must-be" if abs(worse) >= threshold else "Indifferent"
+
+
+def _bootstrap_block(args):
+    """
+    Бутстреп-выборки коэффициентов для блока альтернатив (исполняется и в процессах пула).
+    Повторная выборка строк с возвращением эквивалентна мультиномиальному
+    распределению числа ответов по категориям; вес категории в выборке —
+    число ответов × средний вес ответа этой категории.
+    """
+    counts, mean_weights, n_boot, bounds, seed = args
+    rng = np.random.default_rng(seed)
+    n_responses = counts.sum(axis=1)
+    probabilities = counts / np.maximum(n_responses, 1)[:, np.newaxis]
+    probabilities[n_responses == 0, QUESTIONABLE] = 1.0
+
+    draws = rng.multinomial(n_responses, probabilities, size=(n_boot, len(counts)))
+    better, worse = better_worse(draws * mean_weights)
+    # Альтернативы без ответов A, O, M, I дают столбцы из одних NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return (np.nanpercentile(better, bounds, axis=0),
+                np.nanpercentile(worse, bounds, axis=0))
+
+
+def kano_better_worse(source, n_boot=2000, confidence=0.95, threshold=0.5, seed=None,
+                      block_size=256, workers=None, parallel_threshold=2000):
+    """
+    Коэффициенты Better/Worse с бутстреп-доверительными интервалами.
+
+    source — путь к CSV или KanoHistogram (например, собранный потоково).
+    Выборки строятся по гистограммам без повторного чтения строк; альтернативы
+    обрабатываются блоками по block_size, а при числе альтернатив не меньше
+    parallel_threshold блоки распределяются по пулу процессов. Каждый блок
+    получает свой поток случайных чисел от seed, поэтому результат не зависит
+    от числа процессов. Позиция считается пограничной, если доверительный
+    интервал Better или |Worse| содержит порог threshold.
+    """
+    histogram = KanoHistogram.from_csv(source) if isinstance(source, (str, os.PathLike)) else source
+    alternatives = histogram.alternatives
+    counts = histogram.counts
+    mean_weights = np.divide(histogram.totals, counts, out=np.zeros_like(histogram.totals), where=counts > 0)
+
+    alpha = (1 - confidence) / 2 * 100
+    bounds = (alpha, 100 - alpha)
+    starts = list(range(0, len(alternatives), block_size))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [(counts[start:start + block_size], mean_weights[start:start + block_size], n_boot, bounds, block_seed)
+             for start, block_seed in zip(starts, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    if len(alternatives) >= parallel_threshold and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            blocks = list(pool.map(_bootstrap_block, tasks))
+    else:
+        blocks = [_bootstrap_block(task) for task in tasks]
+
+    better_ci = np.concatenate([block[0] for block in blocks], axis=1) if blocks else np.zeros((2, 0))
+    worse_ci = np.concatenate([block[1] for block in blocks], axis=1) if blocks else np.zeros((2, 0))
+    better, worse = better_worse(histogram.totals)
+    # −0.0 для альтернатив без O и M выводится как 0.0
+    worse, worse_ci = worse + 0.0, worse_ci + 0.0
+
+    results = {}
+    for a, alt in enumerate(alternatives):
+        if np.isnan(better[a]):
+            results[alt] = {
+                "better": None, "worse": None, "better_ci": None, "worse_ci": None,
+                "responses": int(counts[a].sum()), "quadrant": None, "borderline": False,
+                "comment": "Нет ответов категорий A, O, M, I — коэффициенты не определены"
+            }
+            continue
+
+        b_low, b_high = better_ci[0, a], better_ci[1, a]
+        w_low, w_high = worse_ci[0, a], worse_ci[1, a]
+        borderline = bool(b_low <= threshold <= b_high or -w_high <= threshold <= -w_low)
+        quadrant = better_worse_quadrant(better[a], worse[a], threshold)
+        results[alt] = {
+            "better": round(float(better[a]), 3),
+            "worse": round(float(worse[a]), 3),
+            "better_ci": (round(float(b_low), 3), round(float(b_high), 3)),
+            "worse_ci": (round(float(w_low), 3), round(float(w_high), 3)),
+            "responses": int(counts[a].sum()),
+            "quadrant": quadrant,
+            "borderline": borderline,
+            "comment": (f"Better {better[a]:.2f} [{b_low:.2f}; {b_high:.2f}], "
+                        f"Worse {worse[a]:.2f} [{w_low:.2f}; {w_high:.2f}]: {quadrant}"
+                        + (" (пограничная позиция)" if borderline else ""))
+        }
+    return results
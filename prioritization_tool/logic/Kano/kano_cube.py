@@ -0,0 +1,128 @@
+import numpy as np
+
+from prioritization_tool.logic.parse_cache import cached_parse
+from prioritization_tool.logic.Kano.kano import (
+    KANO_CATEGORIES, KanoHistogram, load_kano_responses, classify_codes, category_distribution
+)
+
+
+def _build_cube(filepath):
+    responses = load_kano_responses(filepath)
+    alternatives, stakeholders = responses["alternatives"], responses["stakeholders"]
+    categories = classify_codes(responses["functional"], responses["dysfunctional"])
+
+    # Группа распределения — пара (альтернатива, стейкхолдер)
+    n_alts, n_stake = len(alternatives), len(stakeholders)
+    groups = responses["alternative_codes"].astype(np.int64) * n_stake + responses["stakeholder_codes"]
+    totals, counts, first_row = category_distribution(groups, categories, responses["weights"], n_alts * n_stake)
+
+    shape = (n_alts, n_stake, len(KANO_CATEGORIES))
+    return {
+        "alternatives": alternatives,
+        "stakeholders": stakeholders,
+        "totals": totals.reshape(shape),
+        "counts": counts.reshape(shape),
+        "first_row": first_row.reshape(shape),
+    }
+
+
+class KanoCube:
+    """
+    Куб анкеты Кано (альтернатива, стейкхолдер, категория): взвешенные
+    суммы, число ответов и номер первой строки каждой ячейки.
+
+    Запрос по сегменту (любому набору стейкхолдеров) — сумма срезов куба
+    без обращения к исходным ответам; результат совпадает с process_kano_csv
+    по отфильтрованному файлу, включая порядок альтернатив и категорий.
+    Куб сохраняется в .npz и загружается в следующих сессиях.
+    """
+
+    def __init__(self, alternatives, stakeholders, totals, counts, first_row):
+        self.alternatives = list(alternatives)
+        self.stakeholders = list(stakeholders)
+        self.totals = np.asarray(totals, dtype=float)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.first_row = np.asarray(first_row, dtype=np.int64)
+        self._stake_index = {stake: i for i, stake in enumerate(self.stakeholders)}
+
+    @classmethod
+    def from_csv(cls, filepath):
+        """Построение куба по CSV формата process_kano_csv (через кэш разбора)"""
+        return cls.from_arrays(cached_parse("kano.cube", filepath, _build_cube))
+
+    def to_arrays(self):
+        return {
+            "alternatives": np.array(self.alternatives, dtype=str),
+            "stakeholders": np.array(self.stakeholders, dtype=str),
+            "totals": self.totals,
+            "counts": self.counts,
+            "first_row": self.first_row,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["alternatives"].tolist(), arrays["stakeholders"].tolist(),
+                   arrays["totals"], arrays["counts"], arrays["first_row"])
+
+    def save(self, path):
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays({name: data[name] for name in data.files})
+
+    def segment(self, stakeholders=None):
+        """Гистограмма KanoHistogram сегмента (None — все стейкхолдеры)"""
+        return self._histogram(self._mask(stakeholders))
+
+    def query(self, stakeholders=None):
+        """Итоговые оценки сегмента в формате process_kano_csv"""
+        return self.segment(stakeholders).results()
+
+    def query_segments(self, segments):
+        """
+        Результаты нескольких сегментов {имя: [стейкхолдеры]} за один проход:
+        срезы суммируются произведением матрицы принадлежности на куб.
+        """
+        membership = np.array([self._mask(members) for members in segments.values()], dtype=float)
+        totals = np.einsum("gs,asc->gac", membership, self.totals)
+        counts = np.einsum("gs,asc->gac", membership.astype(np.int64), self.counts)
+        return {
+            name: self._histogram(membership[g] > 0, totals[g], counts[g]).results()
+            for g, name in enumerate(segments)
+        }
+
+    def _mask(self, stakeholders):
+        if stakeholders is None:
+            return np.ones(len(self.stakeholders), dtype=bool)
+        unknown = [stake for stake in stakeholders if stake not in self._stake_index]
+        if unknown:
+            raise ValueError(f"Стейкхолдеры не найдены в кубе: {unknown}")
+        mask = np.zeros(len(self.stakeholders), dtype=bool)
+        mask[[self._stake_index[stake] for stake in stakeholders]] = True
+        return mask
+
+    def _histogram(self, mask, totals=None, counts=None):
+        if totals is None:
+            totals = self.totals[:, mask].sum(axis=1)
+            counts = self.counts[:, mask].sum(axis=1)
+
+        # Первая строка пары в сегменте — минимум по выбранным стейкхолдерам
+        first_row = np.where(self.first_row[:, mask] >= 0, self.first_row[:, mask], np.iinfo(np.int64).max)
+        first_row = first_row.min(axis=1)
+        first_row[first_row == np.iinfo(np.int64).max] = -1
+
+        # Альтернативы без ответов в сегменте исключаются, остальные — в порядке первого появления
+        alt_first = np.where(first_row >= 0, first_row, np.iinfo(np.int64).max).min(axis=1)
+        present = np.flatnonzero(alt_first < np.iinfo(np.int64).max)
+        present = present[np.argsort(alt_first[present], kind="stable")]
+
+        return KanoHistogram.from_arrays({
+            "alternatives": np.array([self.alternatives[a] for a in present], dtype=str),
+            "totals": totals[present],
+            "counts": counts[present],
+            "first_row": first_row[present],
+            # Номера строк относятся к исходному файлу: смещение при слиянии — все его строки
+            "rows": np.array(int(self.counts.sum()), dtype=np.int64),
+        })
@@ -1,5 +1,7 @@
 import pandas as pd
+import numpy as np
 import re
+from functools import lru_cache
 
 # Разрешенные комбинации категорий (в алфавитном порядке)
 VALID_COMBINATIONS = {
@@ -11,61 +13,135 @@ VALID_COMBINATIONS = {
 
 CATEGORY_ORDER = ["M", "S", "C", "W"]
 
-def parse_score_string(score_str):
-    """
-    Преобразует строку вида "60% M, 40% S" в словарь {"M": 0.6, "S": 0.4}
-    """
+# Битовые маски категорий: сочетание проверяется одним поиском во множестве масок
+CATEGORY_BITS = {label: 1 << i for i, label in enumerate(CATEGORY_ORDER)}
+VALID_MASKS = frozenset(sum(CATEGORY_BITS[label] for label in combo) for combo in VALID_COMBINATIONS)
+
+_SCORE_PART = re.compile(r'\s*(\d+)%\s*([MSCW])')
+
+
+@lru_cache(maxsize=4096)
+def _parse_score_items(score_str):
+    """Разобранная строка оценки: пары (категория, доля) в порядке появления в строке"""
     score_str = score_str.strip('"').strip()
     parts = score_str.split(',')
     score_dict = {}
     total = 0.0
+    mask = 0
 
     for part in parts:
-        match = re.match(r'\s*(\d+)%\s*([MSCW])', part.strip())
+        match = _SCORE_PART.match(part.strip())
         if not match:
             raise ValueError(f"Неверный формат оценки: '{part.strip()}'")
         percent, label = match.groups()
         value = int(percent) / 100
         score_dict[label] = score_dict.get(label, 0.0) + value
         total += value
+        mask |= CATEGORY_BITS[label]
 
     # Проверка суммы процентов
     if abs(total - 1.0) > 0.01:
         raise ValueError(f"Сумма процентов должна быть 100%, а не {total * 100:.1f}%")
 
     # Проверка допустимых сочетаний
-    keys = tuple(sorted(score_dict.keys()))
-    if keys not in VALID_COMBINATIONS:
+    if mask not in VALID_MASKS:
         raise ValueError(f"Недопустимое сочетание категорий: {list(score_dict.keys())}. "
                          f"Допустимы только пары: M/S, S/C, C/W, а также одиночные M, S, C, W.")
 
-    return score_dict
+    return tuple(score_dict.items())
 
 
-def load_requirements(filepath):
+def parse_score_string(score_str):
     """
-    Загружает и валидирует CSV с требованиями.
-    Возвращает структуру вида: {альтернатива -> критерий -> стейкхолдер -> {"M": ..., "S": ...}}
+    Преобразует строку вида "60% M, 40% S" в словарь {"M": 0.6, "S": 0.4}
+    """
+    if not isinstance(score_str, str):
+        raise ValueError(f"Пустая или нестроковая оценка: {score_str!r}")
+    return dict(_parse_score_items(score_str))
+
+
+def score_vector(score_dict):
+    """Доли категорий в порядке CATEGORY_ORDER: (M, S, C, W)"""
+    return [score_dict.get(label, 0.0) for label in CATEGORY_ORDER]
+
+
+def load_requirements_table(filepath):
+    """
+    Загружает и валидирует CSV с требованиями в столбцовом виде.
+
+    Каждая уникальная строка оценки разбирается один раз. Возвращает словарь
+    массивов по записям (альтернатива, критерий, стейкхолдер): "alternatives",
+    "criteria", "stakeholders", "scores" формы (записи, 4) в порядке
+    CATEGORY_ORDER и "score_codes" — индексы в списке "score_dicts" разобранных
+    оценок. Повторная запись одной тройки заменяет предыдущую, порядок записей
+    совпадает с порядком вложенной структуры load_requirements.
     """
     df = pd.read_csv(filepath)
     required_cols = {"Альтернатива", "Критерий", "Стейкхолдер", "Оценка"}
     if not required_cols.issubset(df.columns):
         raise ValueError(f"Файл должен содержать столбцы: {', '.join(required_cols)}")
 
-    data = {}
-
-    for _, row in df.iterrows():
-        alt = row["Альтернатива"]
-        crit = row["Критерий"]
-        stakeholder = row["Стейкхолдер"]
-        score_str = row["Оценка"]
+    alt_codes, alternatives = pd.factorize(df["Альтернатива"], use_na_sentinel=False)
+    crit_codes, criteria = pd.factorize(df["Критерий"], use_na_sentinel=False)
+    stake_codes, stakeholders = pd.factorize(df["Стейкхолдер"], use_na_sentinel=False)
+    value_codes, uniques = pd.factorize(df["Оценка"], use_na_sentinel=False)
 
+    # Разбор уникальных строк; при ошибках сообщается первая по файлу ошибочная строка
+    score_dicts = []
+    errors = {}
+    for k, score_str in enumerate(uniques):
         try:
-            parsed_score = parse_score_string(score_str)
+            score_dicts.append(parse_score_string(score_str))
         except ValueError as e:
-            raise ValueError(f"Ошибка в строке с альтернативой '{alt}', критерием '{crit}', стейкхолдером '{stakeholder}': {e}")
+            score_dicts.append(None)
+            errors[k] = e
+    if errors:
+        bad_rows = np.flatnonzero(np.isin(value_codes, list(errors)))
+        row = int(bad_rows[0])
+        raise ValueError(
+            f"Ошибка в строке {row + 1} с альтернативой '{df['Альтернатива'].iat[row]}', "
+            f"критерием '{df['Критерий'].iat[row]}', стейкхолдером '{df['Стейкхолдер'].iat[row]}': "
+            f"{errors[int(value_codes[row])]}"
+        )
+
+    # Записи (альтернатива, критерий, стейкхолдер): коды пар и троек в порядке первого появления
+    pair_codes, _ = pd.factorize(alt_codes.astype(np.int64) * len(criteria) + crit_codes)
+    entry_codes, _ = pd.factorize(pair_codes.astype(np.int64) * len(stakeholders) + stake_codes)
+    n_entries = int(entry_codes.max()) + 1 if len(entry_codes) else 0
+
+    first = np.full(n_entries, len(df), dtype=np.int64)
+    last = np.full(n_entries, -1, dtype=np.int64)
+    np.minimum.at(first, entry_codes, np.arange(len(df)))
+    np.maximum.at(last, entry_codes, np.arange(len(df)))
+
+    # Порядок вложенных словарей: альтернатива, затем критерий и стейкхолдер по первому появлению
+    order = np.lexsort((entry_codes[first], pair_codes[first], alt_codes[first]))
+    rows_first, rows_last = first[order], last[order]
+
+    score_table = np.array([score_vector(d) for d in score_dicts]).reshape(-1, len(CATEGORY_ORDER))
+    return {
+        "alternatives": np.asarray(alternatives, dtype=object)[alt_codes[rows_first]],
+        "criteria": np.asarray(criteria, dtype=object)[crit_codes[rows_first]],
+        "stakeholders": np.asarray(stakeholders, dtype=object)[stake_codes[rows_first]],
+        "score_codes": value_codes[rows_last],
+        "scores": score_table[value_codes[rows_last]],
+        "score_dicts": score_dicts,
+    }
 
-        data.setdefault(alt, {}).setdefault(crit, {})[stakeholder] = parsed_score
+
+def load_requirements(filepath):
+    """
+    Загружает и валидирует CSV с требованиями.
+    Возвращает структуру вида: {альтернатива -> критерий -> стейкхолдер -> {"M": ..., "S": ...}}
+    """
+    table = load_requirements_table(filepath)
+    score_dicts = table["score_dicts"]
+
+    data = {}
+
+    for alt, crit, stakeholder, code in zip(table["alternatives"].tolist(), table["criteria"].tolist(),
+                                            table["stakeholders"].tolist(), table["score_codes"].tolist()):
+        data.setdefault(alt, {}).setdefault(crit, {})[stakeholder] = dict(score_dicts[code])
 
     return data
 
@@ -78,10 +154,4 @@ def load_weights(filepath):
     if not {"Стейкхолдер", "Вес"}.issubset(df.columns):
         raise ValueError("Файл с весами должен содержать столбцы: Стейкхолдер, Вес")
 
-    weights = {}
-    for _, row in df.iterrows():
-        stakeholder = row["Стейкхолдер"]
-        weight = float(row["Вес"])
-        weights[stakeholder] = weight
-
-    return weights
+    return dict(zip(df["Стейкхолдер"].tolist(), df["Вес"].astype(float).tolist()))
@@ -2,9 +2,8 @@ import pandas as pd
 import numpy as np
 
 
-def process_topsis(file_path):
-    df = pd.read_csv(file_path)
-
+def split_topsis_frame(df):
+    """Разбор DataFrame для TOPSIS: имена альтернатив, критерии, матрица и веса стейкхолдеров"""
     if "Альтернатива" not in df.columns or "Вес стейкхолдера" not in df.columns:
         raise ValueError("CSV должен содержать колонки 'Альтернатива' и 'Вес стейкхолдера'")
 
@@ -13,38 +12,155 @@ def process_topsis(file_path):
     criteria_cols = [col for col in df.columns if col not in ["Альтернатива", "Вес стейкхолдера"]]
     matrix = df[criteria_cols].astype(float).values
 
-    # 1. Нормализация
-    norm_matrix = matrix / np.sqrt((matrix ** 2).sum(axis=0))
+    return alt_names, criteria_cols, matrix, stakeholder_weights
+
+
+def load_topsis_matrix(file_path):
+    """Чтение CSV для TOPSIS целиком"""
+    return split_topsis_frame(pd.read_csv(file_path))
+
+
+def topsis_closeness(matrix, stakeholder_weights):
+    """
+    Векторизованный TOPSIS сразу для набора сценариев.
+    matrix: (альтернативы, критерии) или (сценарии, альтернативы, критерии)
+    stakeholder_weights: (альтернативы,) или (сценарии, альтернативы)
+    Возвращает коэффициенты близости формы (сценарии, альтернативы).
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    weights = np.asarray(stakeholder_weights, dtype=float)
+    if matrix.ndim == 2:
+        matrix = matrix[np.newaxis]
+    if weights.ndim == 1:
+        weights = weights[np.newaxis]
+    shapes_ok = matrix.ndim == 3 and weights.ndim == 2 and matrix.shape[1] == weights.shape[1]
+    if shapes_ok and matrix.shape[0] != weights.shape[0]:
+        shapes_ok = 1 in (matrix.shape[0], weights.shape[0])
+    if not shapes_ok:
+        raise ValueError(
+            f"Несовместимые размерности: матрица {matrix.shape}, веса {weights.shape}"
+        )
+
+    # 1. Нормализация (по столбцам каждого сценария)
+    norm_matrix = matrix / np.sqrt((matrix ** 2).sum(axis=1, keepdims=True))
 
     # 2. Взвешивание по весам стейкхолдеров (на каждую строку)
-    weighted_matrix = norm_matrix * stakeholder_weights[:, np.newaxis]
+    weighted_matrix = norm_matrix * weights[:, :, np.newaxis]
 
     # 3. Идеальные решения (PIS и NIS)
-    pis = np.max(weighted_matrix, axis=0)
-    nis = np.min(weighted_matrix, axis=0)
+    pis = np.max(weighted_matrix, axis=1, keepdims=True)
+    nis = np.min(weighted_matrix, axis=1, keepdims=True)
 
     # 4. Расстояния до идеалов
-    d_plus = np.linalg.norm(weighted_matrix - pis, axis=1)
-    d_minus = np.linalg.norm(weighted_matrix - nis, axis=1)
+    d_plus = np.sqrt(((weighted_matrix - pis) ** 2).sum(axis=2))
+    d_minus = np.sqrt(((weighted_matrix - nis) ** 2).sum(axis=2))
+
+    # 5. Коэффициент близости
+    return d_minus / (d_plus + d_minus)
+
+
+def topsis_batch(matrix, stakeholder_weights):
+    """
+    Пакетный TOPSIS: коэффициенты близости (сценарии, альтернативы)
+    и индексы альтернатив по убыванию приоритета для каждого сценария.
+    """
+    scores = topsis_closeness(matrix, stakeholder_weights)
+    ranking = np.argsort(-scores, axis=1, kind="stable")
+    return scores, ranking
+
+
+def process_topsis_scenarios(file_path, scenario_weights):
+    """
+    Расчет TOPSIS для набора сценариев весов стейкхолдеров по одному CSV.
+    scenario_weights: (сценарии, альтернативы) — веса в порядке строк файла.
+    """
+    alt_names, _, matrix, _ = load_topsis_matrix(file_path)
+    scores, ranking = topsis_batch(matrix, scenario_weights)
+    return list(alt_names), scores, ranking
+
+
+def iter_topsis_chunks(file_path, chunksize):
+    """Потоковое чтение CSV для TOPSIS порциями по chunksize строк"""
+    for chunk in pd.read_csv(file_path, chunksize=chunksize):
+        alt_names, _, matrix, stakeholder_weights = split_topsis_frame(chunk)
+        yield alt_names, matrix, stakeholder_weights
+
 
-    # 5. Расчет приоритета
-    scores = d_minus / (d_plus + d_minus)
+def process_topsis_streaming(file_path, output_path, chunksize=100_000):
+    """
+    Двухпроходный TOPSIS для файлов, не помещающихся в память.
+    Проход 1: суммы квадратов по столбцам и экстремумы взвешенных значений.
+    Проход 2: расстояния и коэффициенты близости пишутся в output_path порциями.
+    Пиковая память ограничена размером порции. Возвращает число альтернатив.
+    """
+    # Проход 1. Агрегаты по столбцам
+    sum_squares = None
+    raw_max = None
+    raw_min = None
+    for _, matrix, stakeholder_weights in iter_topsis_chunks(file_path, chunksize):
+        # Взвешенные, но еще не нормализованные значения: норма столбца
+        # положительна, поэтому экстремумы сохраняются после деления на нее
+        raw_weighted = matrix * stakeholder_weights[:, np.newaxis]
+        chunk_squares = (matrix ** 2).sum(axis=0)
+        if sum_squares is None:
+            sum_squares = chunk_squares
+            raw_max = raw_weighted.max(axis=0)
+            raw_min = raw_weighted.min(axis=0)
+        else:
+            sum_squares += chunk_squares
+            raw_max = np.maximum(raw_max, raw_weighted.max(axis=0))
+            raw_min = np.minimum(raw_min, raw_weighted.min(axis=0))
+
+    if sum_squares is None:
+        raise ValueError("CSV не содержит ни одной альтернативы")
+
+    col_norms = np.sqrt(sum_squares)
+    pis = raw_max / col_norms
+    nis = raw_min / col_norms
+
+    # Проход 2. Расстояния до идеалов и запись результатов
+    total = 0
+    with open(output_path, "w", encoding="utf-8", newline="") as out:
+        out.write("Альтернатива,Оценка,Комментарий\n")
+        for alt_names, matrix, stakeholder_weights in iter_topsis_chunks(file_path, chunksize):
+            weighted_matrix = matrix / col_norms * stakeholder_weights[:, np.newaxis]
+            d_plus = np.sqrt(((weighted_matrix - pis) ** 2).sum(axis=1))
+            d_minus = np.sqrt(((weighted_matrix - nis) ** 2).sum(axis=1))
+            scores = np.round(d_minus / (d_plus + d_minus), 3)
+
+            pd.DataFrame({
+                "Альтернатива": alt_names.values,
+                "Оценка": np.round(scores * 100, 2),
+                "Комментарий": [interpret_score(score) for score in scores],
+            }).to_csv(out, header=False, index=False)
+            total += len(scores)
+
+    return total
+
+
+def interpret_score(score):
+    if score > 0.65:
+        return "Высокий приоритет (реализовать в первую очередь)"
+    elif score >= 0.4:
+        return "Средний приоритет (возможна реализация при наличии ресурсов)"
+    else:
+        return "Низкий приоритет (может быть отложен)"
+
+
+def process_topsis(file_path):
+    alt_names, _, matrix, stakeholder_weights = load_topsis_matrix(file_path)
+
+    # 1-5. Нормализация, взвешивание, идеальные решения, расстояния и приоритет
+    scores = topsis_closeness(matrix, stakeholder_weights)[0]
     scores = np.round(scores, 3)
 
     # 6. Классификация по диапазонам
     results = {}
     for i, name in enumerate(alt_names):
         score = scores[i]
-        if score > 0.65:
-            comment = "Высокий приоритет (реализовать в первую очередь)"
-        elif score >= 0.4:
-            comment = "Средний приоритет (возможна реализация при наличии ресурсов)"
-        else:
-            comment = "Низкий приоритет (может быть отложен)"
-
         results[name] = {
             "score": round(score * 100, 2),
-            "comment": comment
+            "comment": interpret_score(score)
         }
 
     return results
@@ -0,0 +1,211 @@
+import heapq
+import numpy as np
+
+from prioritization_tool.logic.TOPSIS.topsis import load_topsis_matrix, interpret_score
+
+
+class TopsisIndex:
+    """
+    Инкрементальный TOPSIS для «живого» бэклога.
+
+    Хранит исходные значения альтернатив, суммы квадратов по столбцам и
+    мультимножества экстремумов взвешенных столбцов (кучи с ленивым удалением).
+    Вставка, изменение и удаление альтернативы обновляют агрегаты за
+    O(критерии · log N). Изменение нормы столбца сдвигает расстояния всех
+    альтернатив, поэтому полные оценки пересчитываются лениво одним
+    векторизованным проходом при первом запросе после изменений, а оценка
+    одной альтернативы считается за O(критерии).
+    """
+
+    def __init__(self, criteria, capacity=1024):
+        self.criteria = list(criteria)
+        n = len(self.criteria)
+        capacity = max(int(capacity), 1)
+
+        self._values = np.zeros((capacity, n))
+        self._weights = np.zeros(capacity)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._version = np.zeros(capacity, dtype=np.int64)
+        self._names = [None] * capacity
+        self._slots = {}
+        self._free = []
+        self._size = 0
+
+        self._sum_squares = np.zeros(n)
+        self._max_heaps = [[] for _ in range(n)]
+        self._min_heaps = [[] for _ in range(n)]
+        self._cached_scores = None
+
+    @classmethod
+    def from_csv(cls, file_path, capacity=None):
+        """Построение индекса по CSV формата process_topsis"""
+        alt_names, criteria_cols, matrix, stakeholder_weights = load_topsis_matrix(file_path)
+        index = cls(criteria_cols, capacity or 2 * len(alt_names))
+        for name, values, weight in zip(alt_names, matrix, stakeholder_weights):
+            index.upsert(name, values, weight)
+        return index
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, alt):
+        return alt in self._slots
+
+    # ---------------------------- изменения ----------------------------
+
+    def upsert(self, alt, values, stakeholder_weight):
+        """Добавляет альтернативу или заменяет ее оценки и вес"""
+        values = np.asarray(values, dtype=float)
+        if values.shape != (len(self.criteria),):
+            raise ValueError(
+                f"Ожидалось {len(self.criteria)} значений критериев, получено {values.shape}"
+            )
+
+        slot = self._slots.get(alt)
+        if slot is None:
+            slot = self._allocate(alt)
+        else:
+            self._sum_squares -= self._values[slot] ** 2
+
+        self._values[slot] = values
+        self._weights[slot] = float(stakeholder_weight)
+        self._version[slot] += 1
+        self._sum_squares += values ** 2
+
+        version = int(self._version[slot])
+        for j, raw in enumerate(values * self._weights[slot]):
+            heapq.heappush(self._max_heaps[j], (-raw, slot, version))
+            heapq.heappush(self._min_heaps[j], (raw, slot, version))
+
+        self._cached_scores = None
+        self._compact_heaps()
+
+    def delete(self, alt):
+        """Удаляет альтернативу из индекса"""
+        if alt not in self._slots:
+            raise KeyError(f"Альтернатива '{alt}' отсутствует в индексе")
+
+        slot = self._slots.pop(alt)
+        self._sum_squares -= self._values[slot] ** 2
+        self._active[slot] = False
+        self._version[slot] += 1
+        self._names[slot] = None
+        self._free.append(slot)
+        self._cached_scores = None
+        self._compact_heaps()
+
+    def rebuild(self):
+        """Точный пересчет агрегатов по хранимым значениям (сброс накопленной погрешности)"""
+        active = self._active[:self._size]
+        self._sum_squares = (self._values[:self._size][active] ** 2).sum(axis=0)
+        self._rebuild_heaps()
+        self._cached_scores = None
+
+    # ---------------------------- оценки ----------------------------
+
+    def ideal_solutions(self):
+        """Текущие PIS и NIS во взвешенном нормализованном пространстве"""
+        if not self._slots:
+            raise ValueError("Индекс не содержит альтернатив")
+        col_norms = np.sqrt(np.maximum(self._sum_squares, 0.0))
+        raw_max = np.array([self._peek(heap, sign=-1) for heap in self._max_heaps])
+        raw_min = np.array([self._peek(heap, sign=1) for heap in self._min_heaps])
+        return raw_max / col_norms, raw_min / col_norms, col_norms
+
+    def score(self, alt):
+        """Коэффициент близости одной альтернативы за O(критерии)"""
+        slot = self._slots[alt]
+        if self._cached_scores is not None:
+            return float(self._cached_scores[slot])
+        pis, nis, col_norms = self.ideal_solutions()
+        weighted = self._values[slot] / col_norms * self._weights[slot]
+        d_plus = np.sqrt(((weighted - pis) ** 2).sum())
+        d_minus = np.sqrt(((weighted - nis) ** 2).sum())
+        return float(d_minus / (d_plus + d_minus))
+
+    def scores(self):
+        """Коэффициенты близости всех альтернатив: {альтернатива: score}"""
+        closeness = self._all_scores()
+        return {alt: float(closeness[slot]) for alt, slot in self._slots.items()}
+
+    def ranking(self, top=None):
+        """Альтернативы по убыванию коэффициента близости"""
+        closeness = self._all_scores()
+        slots = np.flatnonzero(self._active[:self._size])
+        order = slots[np.argsort(-closeness[slots], kind="stable")]
+        if top is not None:
+            order = order[:top]
+        return [self._names[slot] for slot in order]
+
+    def results(self):
+        """Результаты в формате process_topsis"""
+        results = {}
+        for alt, score in self.scores().items():
+            score = round(score, 3)
+            results[alt] = {
+                "score": round(score * 100, 2),
+                "comment": interpret_score(score)
+            }
+        return results
+
+    # ---------------------------- служебное ----------------------------
+
+    def _all_scores(self):
+        if self._cached_scores is None:
+            pis, nis, col_norms = self.ideal_solutions()
+            values = self._values[:self._size]
+            weighted = values / col_norms * self._weights[:self._size, np.newaxis]
+            d_plus = np.sqrt(((weighted - pis) ** 2).sum(axis=1))
+            d_minus = np.sqrt(((weighted - nis) ** 2).sum(axis=1))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                closeness = d_minus / (d_plus + d_minus)
+            closeness[~self._active[:self._size]] = np.nan
+            self._cached_scores = closeness
+        return self._cached_scores
+
+    def _allocate(self, alt):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._weights):
+                self._grow()
+            slot = self._size
+            self._size += 1
+        self._slots[alt] = slot
+        self._names[slot] = alt
+        self._active[slot] = True
+        return slot
+
+    def _grow(self):
+        capacity = 2 * len(self._weights)
+        extra = capacity - len(self._weights)
+        self._values = np.vstack([self._values, np.zeros((extra, self._values.shape[1]))])
+        self._weights = np.concatenate([self._weights, np.zeros(extra)])
+        self._active = np.concatenate([self._active, np.zeros(extra, dtype=bool)])
+        self._version = np.concatenate([self._version, np.zeros(extra, dtype=np.int64)])
+        self._names.extend([None] * extra)
+
+    def _is_current(self, slot, version):
+        return self._active[slot] and self._version[slot] == version
+
+    def _peek(self, heap, sign):
+        while heap and not self._is_current(heap[0][1], heap[0][2]):
+            heapq.heappop(heap)
+        return sign * heap[0][0]
+
+    def _compact_heaps(self):
+        # Устаревшие записи в кучах удаляются лениво; при сильном
+        # разрастании куч перестраиваем их целиком
+        if self._max_heaps and len(self._max_heaps[0]) > 4 * max(len(self._slots), 256):
+            self._rebuild_heaps()
+
+    def _rebuild_heaps(self):
+        slots = np.flatnonzero(self._active[:self._size])
+        raw = self._values[slots] * self._weights[slots, np.newaxis]
+        versions = self._version[slots]
+        for j in range(len(self.criteria)):
+            column = raw[:, j].tolist()
+            self._max_heaps[j] = [(-v, int(s), int(ver)) for v, s, ver in zip(column, slots, versions)]
+            self._min_heaps[j] = [(v, int(s), int(ver)) for v, s, ver in zip(column, slots, versions)]
+            heapq.heapify(self._max_heaps[j])
+            heapq.heapify(self._min_heaps[j])
@@ -0,0 +1,235 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional
+
+from prioritization_tool.logic.fuzzy_ahp import (
+    load_criteria_matrix, criteria_weights, principal_eigenvector, consistency_ratio
+)
+
+
+class AHPHierarchy:
+    """
+    Многоуровневая иерархия AHP: цель → темы → критерии → требования.
+
+    Каждый внутренний узел хранит собственную матрицу парных сравнений
+    дочерних узлов (нечеткую (k, k, 3) или четкую (k, k)) либо готовые
+    локальные веса; узел без суждений делит вес поровну между детьми.
+    Глобальный вес узла — произведение локальных весов на пути от цели.
+
+    Локальные веса кэшируются по узлам. Изменение суждений узла
+    сбрасывает только его локальные веса и помечает его поддерево:
+    при следующем запросе глобальные веса пересчитываются лишь в
+    помеченных поддеревьях, остальная иерархия берется из кэша.
+    """
+
+    def __init__(self, goal: str = "Цель", weight_method: str = "geometric"):
+        self.weight_method = weight_method
+        self._names: List[str] = [goal]
+        self._index: Dict[str, int] = {goal: 0}
+        self._parent: List[int] = [-1]
+        self._depth: List[int] = [0]
+        self._children: List[List[int]] = [[]]
+
+        self._judgments: Dict[int, np.ndarray] = {}
+        self._explicit: Dict[int, np.ndarray] = {}
+        self._local: Dict[int, np.ndarray] = {}
+        self._consistency: Dict[int, Dict[str, float]] = {}
+        self._global = np.ones(1)
+        self._dirty = {0}
+
+    @classmethod
+    def from_csv(cls, structure_path: str, weight_method: str = "geometric") -> "AHPHierarchy":
+        """
+        Построение иерархии по CSV с колонками Узел, Родитель.
+        Цель — единственный родитель, который сам не указан как узел.
+        """
+        df = pd.read_csv(structure_path, quotechar='"')
+        if not {"Узел", "Родитель"}.issubset(df.columns):
+            raise ValueError("CSV структуры должен содержать колонки: Узел, Родитель")
+
+        nodes = df["Узел"].astype(str).str.strip().tolist()
+        parents = df["Родитель"].astype(str).str.strip().tolist()
+        roots = sorted(set(parents) - set(nodes))
+        if len(roots) != 1:
+            raise ValueError(f"Иерархия должна иметь ровно одну цель, найдено: {roots}")
+
+        children: Dict[str, List[str]] = {}
+        for node, parent in zip(nodes, parents):
+            children.setdefault(parent, []).append(node)
+
+        hierarchy = cls(roots[0], weight_method)
+        queue = [roots[0]]
+        while queue:
+            parent = queue.pop()
+            for node in children.get(parent, []):
+                hierarchy.add_node(node, parent)
+                queue.append(node)
+
+        if len(hierarchy) != len(nodes) + 1:
+            unreachable = sorted(set(nodes) - set(hierarchy._index))
+            raise ValueError(f"Узлы не связаны с целью (цикл в структуре): {unreachable}")
+        return hierarchy
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, node):
+        return node in self._index
+
+    @property
+    def goal(self) -> str:
+        return self._names[0]
+
+    def children(self, node: str) -> List[str]:
+        return [self._names[c] for c in self._children[self._node_id(node)]]
+
+    def leaves(self) -> List[str]:
+        return [name for i, name in enumerate(self._names) if not self._children[i]]
+
+    # ---------------------------- изменения ----------------------------
+
+    def add_node(self, name: str, parent: str):
+        """
+        Добавляет узел к родителю. Суждения родителя при этом сбрасываются:
+        матрица прежнего размера больше не описывает его детей.
+        """
+        if name in self._index:
+            raise ValueError(f"Узел '{name}' уже есть в иерархии")
+        parent_id = self._node_id(parent)
+
+        node_id = len(self._names)
+        self._names.append(name)
+        self._index[name] = node_id
+        self._parent.append(parent_id)
+        self._depth.append(self._depth[parent_id] + 1)
+        self._children.append([])
+        self._children[parent_id].append(node_id)
+        self._global = np.append(self._global, 0.0)
+
+        self._reset_node(parent_id)
+
+    def set_judgments(self, node: str, matrix: np.ndarray, order: Optional[List[str]] = None):
+        """
+        Задает матрицу парных сравнений детей узла: нечеткую (k, k, 3)
+        или четкую (k, k). order — порядок детей в строках матрицы
+        (по умолчанию порядок добавления).
+        """
+        node_id = self._node_id(node)
+        matrix = np.asarray(matrix, dtype=float)
+        k = len(self._children[node_id])
+        if matrix.shape[:2] != (k, k) or matrix.ndim not in (2, 3) or matrix.shape[2:] not in ((), (3,)):
+            raise ValueError(
+                f"Матрица узла '{node}' должна иметь форму ({k}, {k}) или ({k}, {k}, 3), получено {matrix.shape}"
+            )
+
+        if order is not None:
+            # Строка r матрицы относится к ребенку perm[r]: обратная перестановка
+            # возвращает строки и столбцы к порядку добавления
+            inverse = np.argsort(self._child_permutation(node_id, order))
+            matrix = matrix[np.ix_(inverse, inverse)]
+
+        self._reset_node(node_id)
+        self._judgments[node_id] = matrix
+
+    def set_judgments_from_csv(self, node: str, criteria_path: str):
+        """Матрица узла из файла формата критериев Type-1 Fuzzy AHP"""
+        names, fuzzy_matrix = load_criteria_matrix(criteria_path)
+        self.set_judgments(node, fuzzy_matrix, order=names)
+
+    def set_local_weights(self, node: str, weights: Dict[str, float]):
+        """Готовые локальные веса детей узла (например, из sparse_ahp), нормализуются к 1"""
+        node_id = self._node_id(node)
+        perm = self._child_permutation(node_id, list(weights))
+        values = np.empty(len(perm))
+        values[perm] = np.array(list(weights.values()), dtype=float)
+        if np.any(values < 0) or values.sum() <= 0:
+            raise ValueError(f"Локальные веса узла '{node}' должны быть неотрицательны и не все нулевые")
+
+        self._reset_node(node_id)
+        self._explicit[node_id] = values / values.sum()
+
+    # ---------------------------- запросы ------------------------------
+
+    def local_weights(self, node: str) -> Dict[str, float]:
+        node_id = self._node_id(node)
+        return {self._names[c]: float(w) for c, w in zip(self._children[node_id], self._local_weights(node_id))}
+
+    def consistency(self, node: str) -> Optional[Dict[str, float]]:
+        """λmax, CI и CR матрицы узла (None, если суждения не заданы)"""
+        node_id = self._node_id(node)
+        if node_id not in self._judgments:
+            return None
+        self._local_weights(node_id)
+        return self._consistency.get(node_id)
+
+    def global_weights(self, leaves_only: bool = True) -> Dict[str, float]:
+        """Глобальные веса листьев (или всех узлов) с пересчетом только измененных поддеревьев"""
+        self._refresh()
+        ids = [i for i in range(len(self._names)) if not leaves_only or not self._children[i]]
+        return {self._names[i]: float(self._global[i]) for i in ids}
+
+    # ------------------------- внутренние методы ------------------------
+
+    def _node_id(self, node: str) -> int:
+        if node not in self._index:
+            raise ValueError(f"Узел '{node}' не найден в иерархии")
+        return self._index[node]
+
+    def _child_permutation(self, node_id: int, order: List[str]) -> np.ndarray:
+        children = self._children[node_id]
+        position = {self._names[c]: i for i, c in enumerate(children)}
+        if sorted(order) != sorted(position):
+            raise ValueError(
+                f"Состав детей узла '{self._names[node_id]}' не совпадает: {list(order)} вместо {list(position)}"
+            )
+        return np.array([position[name] for name in order], dtype=np.int64)
+
+    def _reset_node(self, node_id: int):
+        self._judgments.pop(node_id, None)
+        self._explicit.pop(node_id, None)
+        self._local.pop(node_id, None)
+        self._consistency.pop(node_id, None)
+        self._dirty.add(node_id)
+
+    def _local_weights(self, node_id: int) -> np.ndarray:
+        weights = self._local.get(node_id)
+        if weights is not None:
+            return weights
+
+        k = len(self._children[node_id])
+        if node_id in self._explicit:
+            weights = self._explicit[node_id]
+        elif node_id in self._judgments and k > 1:
+            matrix = self._judgments[node_id]
+            if matrix.ndim == 3:
+                weights = criteria_weights(matrix, self.weight_method)
+                crisp = matrix.mean(axis=2)
+            else:
+                weights, _ = principal_eigenvector(matrix)
+                crisp = matrix
+            self._consistency[node_id] = consistency_ratio(crisp)
+        else:
+            weights = np.full(k, 1.0 / k) if k else np.zeros(0)
+
+        self._local[node_id] = weights
+        return weights
+
+    def _refresh(self):
+        if not self._dirty:
+            return
+        # Поддеревья обходятся от верхних узлов: вложенные помеченные узлы уже пересчитаны
+        refreshed = set()
+        for root in sorted(self._dirty, key=lambda i: self._depth[i]):
+            if root in refreshed:
+                continue
+            if root == 0:
+                self._global[0] = 1.0
+            stack = [root]
+            while stack:
+                node_id = stack.pop()
+                refreshed.add(node_id)
+                children = self._children[node_id]
+                if children:
+                    self._global[children] = self._global[node_id] * self._local_weights(node_id)
+                    stack.extend(children)
+        self._dirty.clear()
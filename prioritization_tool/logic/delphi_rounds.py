@@ -0,0 +1,169 @@
+import numpy as np
+
+from prioritization_tool.logic.fuzzy_delphi import (
+    load_delphi_panel, group_by_alternative, weighted_group_means
+)
+
+
+class DelphiRounds:
+    """
+    Многораундовый Delphi с инкрементальной загрузкой раундов.
+
+    Для каждой пары (альтернатива, критерий) хранится агрегат последнего
+    раунда: взвешенное среднее, размах неопределенности (FOU для IT2FS,
+    размах π для IFS), число раундов и признак консенсуса. Каждый новый
+    раунд загружается отдельно и сравнивается только с сохраненными
+    агрегатами, без повторной обработки истории. Пары, достигшие
+    консенсуса, больше не пересчитываются, а критерии, по которым консенсус
+    достигнут для всех альтернатив раунда, пропускаются целиком.
+
+    kind: "it2fs" — формат process_fuzzy_delphi, "ifs" — формат
+    process_delphi_ifs / process_intuitionistic_delphi_csv.
+    """
+
+    def __init__(self, kind="it2fs", mean_tolerance=0.05, spread_tolerance=0.05):
+        if kind not in ("it2fs", "ifs"):
+            raise ValueError(f"Неизвестный тип оценок Delphi: {kind}")
+        self.kind = kind
+        self.mean_tolerance = mean_tolerance
+        self.spread_tolerance = spread_tolerance
+        self.rounds = 0
+
+        width = 4 if kind == "it2fs" else 3
+        self._alternatives = {}
+        self._criteria = {}
+        self._means = np.zeros((0, 0, width))
+        self._spreads = np.zeros((0, 0))
+        self._seen = np.zeros((0, 0), dtype=np.int64)
+        self._consensus = np.zeros((0, 0), dtype=bool)
+        self._consensus_round = np.zeros((0, 0), dtype=np.int64)
+
+    def consensus_criteria(self):
+        """Критерии, по которым консенсус достигнут для всех оцененных альтернатив"""
+        return [crit for crit, j in self._criteria.items() if self._criterion_closed(j)]
+
+    def consensus_share(self):
+        """Доля пар (альтернатива, критерий) с достигнутым консенсусом"""
+        seen = self._seen > 0
+        return float(self._consensus[seen].mean()) if seen.any() else 0.0
+
+    def ingest_round(self, filepath):
+        """
+        Загрузка очередного раунда. Возвращает отчет по раунду:
+        {альтернатива: {критерий: {"mean", "spread", "mean_shift", "spread_change",
+        "consensus"}}} для пересчитанных пар.
+        """
+        panel = load_delphi_panel(filepath, kind=self.kind)
+        file_criteria = panel["criteria"].tolist()
+
+        crit_idx = np.array([self._index(self._criteria, crit) for crit in file_criteria], dtype=np.int64)
+        alternatives, order, starts = group_by_alternative(panel["alternatives"])
+        alt_idx = np.array([self._index(self._alternatives, alt) for alt in alternatives.tolist()],
+                           dtype=np.int64)
+        self._grow()
+
+        # Критерий пропускается, только если консенсус по нему достигнут для всех
+        # альтернатив раунда; новые пары (альтернатива, критерий) всегда открыты
+        active = ~self._consensus[np.ix_(alt_idx, crit_idx)].all(axis=0)
+        self.rounds += 1
+        if not active.any():
+            return {}
+        crit_idx = crit_idx[active]
+        values = panel["values"][:, active]
+
+        means = weighted_group_means(values, panel["weights"], order, starts)
+        if self.kind == "it2fs":
+            spreads = means[:, :, 3] - means[:, :, 0]
+        else:
+            pi_values = values[order][:, :, 2]
+            spreads = (np.maximum.reduceat(pi_values, starts, axis=0)
+                       - np.minimum.reduceat(pi_values, starts, axis=0))
+
+        rows, cols = alt_idx[:, np.newaxis], crit_idx[np.newaxis, :]
+        seen = self._seen[rows, cols] > 0
+        update = ~self._consensus[rows, cols]
+
+        # Сдвиг среднего (вершинное расстояние) и изменение размаха относительно прошлого раунда
+        mean_shift = np.sqrt(np.mean((means - self._means[rows, cols]) ** 2, axis=-1))
+        spread_change = spreads - self._spreads[rows, cols]
+        mean_shift[~seen] = np.nan
+        spread_change[~seen] = np.nan
+
+        with np.errstate(invalid="ignore"):
+            reached = (seen & update
+                       & (mean_shift <= self.mean_tolerance)
+                       & (np.abs(spread_change) <= self.spread_tolerance))
+
+        upd_rows, upd_cols = np.nonzero(update)
+        target = (alt_idx[upd_rows], crit_idx[upd_cols])
+        self._means[target] = means[upd_rows, upd_cols]
+        self._spreads[target] = spreads[upd_rows, upd_cols]
+        self._seen[target] += 1
+        self._consensus[target] = reached[upd_rows, upd_cols]
+        self._consensus_round[target] = np.where(reached[upd_rows, upd_cols], self.rounds, 0)
+
+        active_criteria = [crit for crit, keep in zip(file_criteria, active) if keep]
+        report = {}
+        for a, alt in enumerate(alternatives.tolist()):
+            crit_report = {}
+            for j, crit in enumerate(active_criteria):
+                if not update[a, j]:
+                    continue
+                crit_report[crit] = {
+                    "mean": tuple(np.round(means[a, j], 3)),
+                    "spread": round(float(spreads[a, j]), 3),
+                    "mean_shift": None if not seen[a, j] else round(float(mean_shift[a, j]), 3),
+                    "spread_change": None if not seen[a, j] else round(float(spread_change[a, j]), 3),
+                    "consensus": bool(reached[a, j])
+                }
+            if crit_report:
+                report[alt] = crit_report
+        return report
+
+    def results(self):
+        """Текущее состояние всех пар с номером раунда, в котором достигнут консенсус"""
+        criteria = list(self._criteria)
+        results = {}
+        for alt, a in self._alternatives.items():
+            crit_result = {}
+            for crit in criteria:
+                j = self._criteria[crit]
+                if not self._seen[a, j]:
+                    continue
+                crit_result[crit] = {
+                    "mean": tuple(np.round(self._means[a, j], 3)),
+                    "spread": round(float(self._spreads[a, j]), 3),
+                    "rounds": int(self._seen[a, j]),
+                    "consensus_round": int(self._consensus_round[a, j]) or None
+                }
+            results[alt] = crit_result
+        return results
+
+    def _criterion_closed(self, j):
+        if j >= self._consensus.shape[1]:
+            return False
+        seen = self._seen[:, j] > 0
+        return bool(seen.any() and self._consensus[seen, j].all())
+
+    @staticmethod
+    def _index(mapping, key):
+        if key not in mapping:
+            mapping[key] = len(mapping)
+        return mapping[key]
+
+    def _grow(self):
+        n_alts, n_crit = len(self._alternatives), len(self._criteria)
+        old_alts, old_crit = self._spreads.shape
+        if (n_alts, n_crit) == (old_alts, old_crit):
+            return
+
+        def resized(array):
+            grown = np.zeros((n_alts, n_crit) + array.shape[2:], dtype=array.dtype)
+            grown[:old_alts, :old_crit] = array
+            return grown
+
+        self._means = resized(self._means)
+        self._spreads = resized(self._spreads)
+        self._seen = resized(self._seen)
+        self._consensus = resized(self._consensus)
+        self._consensus_round = resized(self._consensus_round)
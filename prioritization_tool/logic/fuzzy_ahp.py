@@ -1,7 +1,11 @@
+import os
 import pandas as pd
 import numpy as np
 import re
-from typing import Dict, Tuple, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple, List, Union
+
+from prioritization_tool.logic.parse_cache import cached_parse
 
 # ============================ TYPE-1 ============================
 
@@ -55,48 +59,352 @@ def normalize_weights(weights: List[float]) -> List[float]:
     return [w / total for w in weights]
 
 
-def process_fuzzy_ahp_type1(
-        criteria_path: str,
-        alternatives_path: str,
-        weights_path: str
-) -> Dict[str, Dict[str, float]]:
-    """Основная функция обработки для Type-1 Fuzzy AHP"""
-
-    # Загрузка данных с явным указанием quotechar
-    df_criteria = pd.read_csv(criteria_path, quotechar='"')
-    df_alternatives = pd.read_csv(alternatives_path, quotechar='"')
-    df_weights = pd.read_csv(weights_path, quotechar='"')
-
-    # Проверка обязательных колонок
-    if "Эксперт" not in df_weights.columns or "Вес" not in df_weights.columns:
-        raise ValueError("Файл весов должен содержать колонки 'Эксперт' и 'Вес'")
+def parse_tfn_cells(values: np.ndarray) -> np.ndarray:
+    """Разбор массива TFN-строк в (..., 3); каждое уникальное значение разбирается один раз"""
+    value_codes, uniques = pd.factorize(values.ravel(), use_na_sentinel=False)
+    parsed = np.array([parse_tfn(str(value)) for value in uniques]).reshape(-1, 3)
+    return parsed[value_codes].reshape(values.shape + (3,))
 
-    if "Альтернатива" not in df_alternatives.columns or "Эксперт" not in df_alternatives.columns:
-        raise ValueError("Файл альтернатив должен содержать колонки 'Альтернатива' и 'Эксперт'")
 
-    # Обработка критериев
+def _read_criteria_cells(criteria_path: str) -> Tuple[List[str], np.ndarray]:
+    df_criteria = pd.read_csv(criteria_path, quotechar='"')
     criteria_names = df_criteria.columns[1:].tolist()
     n = len(criteria_names)
+    if len(df_criteria) < n:
+        raise ValueError(f"Матрица критериев должна содержать {n} строк (получено {len(df_criteria)})")
+    return criteria_names, df_criteria.iloc[:n, 1:].to_numpy()
+
+
+def _load_criteria_matrix(criteria_path: str) -> Dict[str, np.ndarray]:
+    criteria_names, cells = _read_criteria_cells(criteria_path)
 
     # Построение матрицы парных сравнений
-    fuzzy_matrix = np.zeros((n, n, 3))
-    for i in range(n):
-        for j in range(n):
-            val = str(df_criteria.iloc[i, j + 1])
-            fuzzy_matrix[i, j] = parse_tfn(val)
+    fuzzy_matrix = parse_tfn_cells(cells)
+
+    return {"criteria": np.array(criteria_names, dtype=str), "matrix": fuzzy_matrix}
+
+
+def _load_criteria_upper(criteria_path: str) -> Dict[str, np.ndarray]:
+    criteria_names, cells = _read_criteria_cells(criteria_path)
+    rows, cols = np.triu_indices(len(criteria_names), k=1)
+    # Разбираются только ячейки выше диагонали
+    upper = parse_tfn_cells(cells[rows, cols])
+    if np.any(upper <= 0):
+        raise ValueError("Оценки парных сравнений должны быть положительными")
+    return {"criteria": np.array(criteria_names, dtype=str), "upper": upper}
+
+
+def load_criteria_matrix(criteria_path: str) -> Tuple[List[str], np.ndarray]:
+    """Матрица парных сравнений критериев (n, n, 3) через кэш разбора"""
+    entry = cached_parse("fuzzy_ahp.criteria", criteria_path, _load_criteria_matrix)
+    return entry["criteria"].tolist(), entry["matrix"]
+
+
+class UpperTriangularMatrix:
+    """
+    Компактная матрица парных сравнений: хранятся только TFN выше диагонали
+    в порядке np.triu_indices (n·(n−1)/2, 3); диагональ — единицы, нижний
+    треугольник — обратные числа (1/u, 1/m, 1/l). Строчные агрегаты и
+    умножение дефаззифицированной матрицы на вектор считаются свертками
+    bincount по парам, без построения полной матрицы (n, n, 3).
+    """
+
+    def __init__(self, upper: np.ndarray, n: int):
+        upper = np.asarray(upper, dtype=float)
+        if upper.shape != (n * (n - 1) // 2, 3):
+            raise ValueError(f"Ожидалось {n * (n - 1) // 2} TFN выше диагонали, получено {upper.shape}")
+        self.n = n
+        self.upper = upper
+        self.rows, self.cols = np.triu_indices(n, k=1)
+        self._upper_crisp = upper.mean(axis=1)
+        self._lower_crisp = (1 / upper).mean(axis=1)
+
+    @classmethod
+    def from_full(cls, fuzzy_matrix: np.ndarray) -> "UpperTriangularMatrix":
+        n = fuzzy_matrix.shape[0]
+        rows, cols = np.triu_indices(n, k=1)
+        return cls(fuzzy_matrix[rows, cols], n)
+
+    def to_full(self) -> np.ndarray:
+        full = np.ones((self.n, self.n, 3))
+        full[self.rows, self.cols] = self.upper
+        full[self.cols, self.rows] = 1 / self.upper[:, ::-1]
+        return full
+
+    def _row_totals(self, upper_values: np.ndarray, lower_values: np.ndarray) -> np.ndarray:
+        return np.stack([
+            np.bincount(self.rows, weights=upper_values[:, k], minlength=self.n)
+            + np.bincount(self.cols, weights=lower_values[:, k], minlength=self.n)
+            for k in range(3)
+        ], axis=-1)
+
+    def row_sums(self) -> np.ndarray:
+        """Нечеткие суммы строк (n, 3)"""
+        return 1.0 + self._row_totals(self.upper, 1 / self.upper[:, ::-1])
+
+    def row_geometric_means(self) -> np.ndarray:
+        """Нечеткие геометрические средние строк (n, 3)"""
+        log_upper = np.log(self.upper)
+        return np.exp(self._row_totals(log_upper, -log_upper[:, ::-1]) / self.n)
+
+    def crisp_matvec(self, vector: np.ndarray) -> np.ndarray:
+        """Произведение дефаззифицированной (центроид) матрицы на вектор"""
+        return (vector
+                + np.bincount(self.rows, weights=self._upper_crisp * vector[self.cols], minlength=self.n)
+                + np.bincount(self.cols, weights=self._lower_crisp * vector[self.rows], minlength=self.n))
+
+
+def load_criteria_upper(criteria_path: str) -> Tuple[List[str], UpperTriangularMatrix]:
+    """
+    Компактная матрица критериев через кэш разбора: разбираются только ячейки
+    выше диагонали, нижний треугольник файла не читается и считается обратным.
+    """
+    entry = cached_parse("fuzzy_ahp.criteria_upper", criteria_path, _load_criteria_upper)
+    criteria_names = entry["criteria"].tolist()
+    return criteria_names, UpperTriangularMatrix(entry["upper"], len(criteria_names))
+
+
+def _load_alternative_ratings(alternatives_path: str) -> Dict[str, np.ndarray]:
+    df_alternatives = pd.read_csv(alternatives_path, quotechar='"')
 
-    # Вычисление весов критериев
-    row_gm = np.array([geometric_mean(fuzzy_matrix[i]) for i in range(n)])
-    weights_fuzzy = normalize_weights([defuzzify(row) for row in row_gm])
+    if "Альтернатива" not in df_alternatives.columns or "Эксперт" not in df_alternatives.columns:
+        raise ValueError("Файл альтернатив должен содержать колонки 'Альтернатива' и 'Эксперт'")
 
-    # Обработка альтернатив
-    alternatives = df_alternatives["Альтернатива"].unique()
     crit_names = [col for col in df_alternatives.columns
                   if col not in ["Альтернатива", "Эксперт"]]
+    tfns = parse_tfn_cells(df_alternatives[crit_names].to_numpy())
+
+    return {
+        "alternatives": df_alternatives["Альтернатива"].astype(str).to_numpy(dtype=str),
+        "experts": df_alternatives["Эксперт"].astype(str).to_numpy(dtype=str),
+        "criteria": np.array(crit_names, dtype=str),
+        "tfns": tfns,
+    }
+
+
+def load_alternative_ratings(alternatives_path: str) -> Dict[str, np.ndarray]:
+    """
+    Оценки альтернатив через кэш разбора: столбцы 'alternatives' и 'experts'
+    по строкам файла, 'criteria' и TFN-массив 'tfns' формы (строки, критерии, 3)
+    """
+    return cached_parse("fuzzy_ahp.alternatives", alternatives_path, _load_alternative_ratings)
+
+
+def _geometric_weights(row_gm: np.ndarray) -> np.ndarray:
+    crisp = row_gm.mean(axis=1)
+    return crisp / crisp.sum()
+
+
+def criteria_weights_geometric(fuzzy_matrix: np.ndarray) -> np.ndarray:
+    """Веса критериев: геометрическое среднее строк (n, n, 3), центроид и нормализация"""
+    return _geometric_weights(np.exp(np.mean(np.log(fuzzy_matrix), axis=1)))
+
+
+def criteria_weights_chang(fuzzy_matrix: np.ndarray) -> np.ndarray:
+    """Веса критериев методом анализа протяженности Чанга (extent analysis)"""
+    return _chang_weights(fuzzy_matrix.sum(axis=1))
+
+
+def _chang_weights(row_sums: np.ndarray) -> np.ndarray:
+    total = row_sums.sum(axis=0)
+    # Синтетические протяженности S_i = сумма строки ⊗ (общая сумма)^-1
+    extents = row_sums / total[::-1]
+    l, m, u = extents[:, 0], extents[:, 1], extents[:, 2]
+
+    # Степень возможности V(S_i >= S_k) для всех пар сразу
+    with np.errstate(invalid="ignore", divide="ignore"):
+        possibility = (l[np.newaxis, :] - u[:, np.newaxis]) / (
+            (m[:, np.newaxis] - u[:, np.newaxis]) - (m[np.newaxis, :] - l[np.newaxis, :])
+        )
+    # Правило m_i >= m_k → 1 применяется последним: при совпадающих протяженностях
+    # выполняется и l_k >= u_i, но по определению Чанга приоритет у единицы
+    possibility = np.where(l[np.newaxis, :] >= u[:, np.newaxis], 0.0, possibility)
+    possibility = np.where(m[:, np.newaxis] >= m[np.newaxis, :], 1.0, possibility)
+    np.fill_diagonal(possibility, 1.0)
+
+    degrees = possibility.min(axis=1)
+    if degrees.sum() <= 0:
+        raise ValueError("Метод Чанга дал нулевые веса всех критериев")
+    return degrees / degrees.sum()
+
+
+def criteria_weights_buckley(fuzzy_matrix: np.ndarray) -> np.ndarray:
+    """Веса критериев методом Бакли: нечеткие веса r_i ⊗ (Σ r)^-1, центроид и нормализация"""
+    return _buckley_weights(np.exp(np.mean(np.log(fuzzy_matrix), axis=1)))
+
+
+def _buckley_weights(row_gm: np.ndarray) -> np.ndarray:
+    fuzzy_weights = row_gm / row_gm.sum(axis=0)[::-1]
+    crisp = fuzzy_weights.mean(axis=1)
+    return crisp / crisp.sum()
+
+
+def _random_index_table(size: int = 1024) -> np.ndarray:
+    # Саати для n <= 15, далее аппроксимация Alonso–Lamata: λmax ≈ 2.7699·n − 4.3513
+    saaty = [0.0, 0.0, 0.0, 0.58, 0.90, 1.12, 1.24, 1.32, 1.41, 1.45, 1.49, 1.51, 1.48, 1.56, 1.57, 1.59]
+    n = np.arange(size, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        table = (1.7699 * n - 4.3513) / (n - 1)
+    table[:len(saaty)] = saaty
+    return table
+
+
+RANDOM_INDEX = _random_index_table()
+
+
+def random_index(n: int) -> float:
+    """Случайный индекс согласованности RI(n)"""
+    if n < len(RANDOM_INDEX):
+        return float(RANDOM_INDEX[n])
+    return (1.7699 * n - 4.3513) / (n - 1)
+
+
+def _power_iteration(matvec, n: int, tol: float = 1e-10,
+                     max_iter: int = 1000) -> Tuple[np.ndarray, float]:
+    weights = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        product = matvec(weights)
+        updated = product / product.sum()
+        if np.abs(updated - weights).max() < tol:
+            weights = updated
+            break
+        weights = updated
+    lambda_max = float(np.mean(matvec(weights) / weights))
+    return weights, lambda_max
+
+
+def principal_eigenvector(matrix: np.ndarray, tol: float = 1e-10,
+                          max_iter: int = 1000) -> Tuple[np.ndarray, float]:
+    """Главный собственный вектор положительной матрицы степенным методом и λmax"""
+    return _power_iteration(lambda vector: matrix @ vector, matrix.shape[0], tol, max_iter)
+
+
+def consistency_ratio(matrix: np.ndarray) -> Dict[str, float]:
+    """λmax, индекс (CI) и отношение согласованности (CR) четкой матрицы парных сравнений"""
+    _, lambda_max = principal_eigenvector(matrix)
+    return _consistency_from_lambda(lambda_max, matrix.shape[0])
+
+
+def _consistency_from_lambda(lambda_max: float, n: int) -> Dict[str, float]:
+    ci = (lambda_max - n) / (n - 1) if n > 1 else 0.0
+    ri = random_index(n)
+    return {
+        "lambda_max": lambda_max,
+        "ci": ci,
+        "cr": ci / ri if ri > 0 else 0.0
+    }
+
+
+def criteria_weights_eigenvector(fuzzy_matrix: np.ndarray) -> np.ndarray:
+    """Веса критериев: главный собственный вектор дефаззифицированной матрицы"""
+    weights, _ = principal_eigenvector(fuzzy_matrix.mean(axis=2))
+    return weights
+
+
+WEIGHT_METHODS = {
+    "geometric": criteria_weights_geometric,
+    "chang": criteria_weights_chang,
+    "buckley": criteria_weights_buckley,
+    "eigenvector": criteria_weights_eigenvector,
+}
+
+
+def criteria_weights(fuzzy_matrix: Union[np.ndarray, UpperTriangularMatrix],
+                     method: str = "geometric") -> np.ndarray:
+    """
+    Веса критериев выбранным методом: geometric, chang, buckley или eigenvector.
+    Компактная матрица обрабатывается напрямую, без развертывания в (n, n, 3).
+    """
+    if method not in WEIGHT_METHODS:
+        raise ValueError(f"Неизвестный метод расчета весов '{method}'. Допустимые: {list(WEIGHT_METHODS)}")
+    if not isinstance(fuzzy_matrix, UpperTriangularMatrix):
+        return WEIGHT_METHODS[method](fuzzy_matrix)
+
+    if method == "geometric":
+        return _geometric_weights(fuzzy_matrix.row_geometric_means())
+    if method == "buckley":
+        return _buckley_weights(fuzzy_matrix.row_geometric_means())
+    if method == "chang":
+        return _chang_weights(fuzzy_matrix.row_sums())
+    weights, _ = _power_iteration(fuzzy_matrix.crisp_matvec, fuzzy_matrix.n)
+    return weights
+
+
+def compact_consistency_ratio(compact: UpperTriangularMatrix) -> Dict[str, float]:
+    """λmax, CI и CR дефаззифицированной компактной матрицы"""
+    _, lambda_max = _power_iteration(compact.crisp_matvec, compact.n)
+    return _consistency_from_lambda(lambda_max, compact.n)
+
+
+def check_consistency(matrix: Union[np.ndarray, UpperTriangularMatrix],
+                      max_cr: float = None) -> Dict[str, float]:
+    """Проверка согласованности; при превышении max_cr выбрасывается ValueError"""
+    if isinstance(matrix, UpperTriangularMatrix):
+        consistency = compact_consistency_ratio(matrix)
+    else:
+        consistency = consistency_ratio(matrix)
+    if max_cr is not None and consistency["cr"] > max_cr:
+        raise ValueError(
+            f"Матрица парных сравнений несогласована: CR = {consistency['cr']:.3f} (допустимо {max_cr})"
+        )
+    return consistency
+
+
+def analyze_criteria_matrix(criteria_path: str, method: str = "geometric") -> Dict[str, object]:
+    """Веса критериев выбранным методом и согласованность матрицы из файла критериев"""
+    criteria_names, fuzzy_matrix = load_criteria_matrix(criteria_path)
+    weights = criteria_weights(fuzzy_matrix, method)
+    return {
+        "weights": {crit: float(w) for crit, w in zip(criteria_names, weights)},
+        "consistency": consistency_ratio(fuzzy_matrix.mean(axis=2))
+    }
+
+
+def build_rating_tensor(ratings: Dict[str, np.ndarray]) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+    """
+    Тензор оценок (альтернативы, эксперты, критерии, 3) и число оценок
+    каждой пары (альтернатива, эксперт); повторные строки суммируются.
+    """
+    alt_idx, alternatives = pd.factorize(ratings["alternatives"])
+    exp_idx, experts = pd.factorize(ratings["experts"])
+    n_crit = ratings["tfns"].shape[1]
+
+    tensor = np.zeros((len(alternatives), len(experts), n_crit, 3))
+    counts = np.zeros((len(alternatives), len(experts)))
+    if len(np.unique(alt_idx * len(experts) + exp_idx)) == len(alt_idx):
+        tensor[alt_idx, exp_idx] = ratings["tfns"]
+        counts[alt_idx, exp_idx] = 1.0
+    else:
+        np.add.at(tensor, (alt_idx, exp_idx), ratings["tfns"])
+        np.add.at(counts, (alt_idx, exp_idx), 1.0)
+    return alternatives.tolist(), experts.tolist(), tensor, counts
+
+
+def aggregate_ratings(tensor: np.ndarray, counts: np.ndarray, expert_weights: np.ndarray) -> np.ndarray:
+    """
+    Взвешенная по экспертам агрегация и дефаззификация:
+    четкие оценки (альтернативы, критерии); 0 там, где сумма весов нулевая
+    """
+    weighted_sum = np.einsum("e,aeck->ack", expert_weights, tensor)
+    total_weight = counts @ expert_weights
+    crit_scores = np.zeros(weighted_sum.shape[:2])
+    rated = total_weight > 0
+    crit_scores[rated] = weighted_sum[rated].mean(axis=-1) / total_weight[rated, np.newaxis]
+    return crit_scores
+
+
+def load_expert_weights(weights_path: str) -> Dict[str, float]:
+    """Веса экспертов из файла с колонками 'Эксперт' и 'Вес' (сумма должна быть 1.0)"""
+    # Загрузка данных с явным указанием quotechar
+    df_weights = pd.read_csv(weights_path, quotechar='"')
+
+    # Проверка обязательных колонок
+    if "Эксперт" not in df_weights.columns or "Вес" not in df_weights.columns:
+        raise ValueError("Файл весов должен содержать колонки 'Эксперт' и 'Вес'")
 
     # Создаем словарь весов экспертов
     expert_weights = dict(zip(
-        df_weights["Эксперт"],
+        df_weights["Эксперт"].astype(str),
         df_weights["Вес"].astype(float)
     ))
 
@@ -104,32 +412,48 @@ def process_fuzzy_ahp_type1(
     total_weight = sum(expert_weights.values())
     if not np.isclose(total_weight, 1.0, atol=0.01):
         raise ValueError(f"Сумма весов экспертов должна быть 1.0 (получено {total_weight})")
+    return expert_weights
 
-    alt_scores = {}
-    for alt in alternatives:
-        alt_data = df_alternatives[df_alternatives["Альтернатива"] == alt]
-        crit_scores = []
-
-        for crit in crit_names:
-            weighted_sum = np.zeros(3)
-            total_weight = 0.0
-
-            for _, row in alt_data.iterrows():
-                expert = row["Эксперт"]
-                weight = expert_weights.get(expert, 0.0)
-                tfn = parse_tfn(row[crit])
-                weighted_sum += tfn * weight
-                total_weight += weight
-
-            if total_weight > 0:
-                aggregated = weighted_sum / total_weight
-                crit_scores.append(defuzzify(aggregated))
-            else:
-                crit_scores.append(0.0)
-
-        # Итоговый приоритет альтернативы
-        total_score = sum(w * s for w, s in zip(weights_fuzzy, crit_scores))
 
+def process_fuzzy_ahp_type1(
+        criteria_path: str,
+        alternatives_path: str,
+        weights_path: str,
+        weight_method: str = "geometric",
+        max_cr: float = None,
+        compact: bool = False
+) -> Dict[str, Dict[str, float]]:
+    """
+    Основная функция обработки для Type-1 Fuzzy AHP.
+    weight_method — метод расчета весов критериев (см. WEIGHT_METHODS);
+    при заданном max_cr несогласованная матрица критериев отклоняется.
+    compact=True читает только верхний треугольник матрицы критериев
+    (нижний считается обратным) и считает веса по компактной форме.
+    """
+
+    expert_weights = load_expert_weights(weights_path)
+    ratings = load_alternative_ratings(alternatives_path)
+
+    # Обработка критериев и вычисление их весов
+    if compact:
+        criteria_names, fuzzy_matrix = load_criteria_upper(criteria_path)
+        check_consistency(fuzzy_matrix, max_cr)
+    else:
+        criteria_names, fuzzy_matrix = load_criteria_matrix(criteria_path)
+        check_consistency(fuzzy_matrix.mean(axis=2), max_cr)
+    weights_fuzzy = criteria_weights(fuzzy_matrix, weight_method)
+
+    # Тензор оценок альтернатив и агрегация экспертов одним einsum
+    alternatives, experts, tensor, counts = build_rating_tensor(ratings)
+    weights_vector = np.array([expert_weights.get(expert, 0.0) for expert in experts])
+    crit_scores = aggregate_ratings(tensor, counts, weights_vector)
+
+    # Итоговый приоритет альтернатив (по общим критериям, как при попарном zip)
+    n_common = min(len(weights_fuzzy), crit_scores.shape[1])
+    total_scores = crit_scores[:, :n_common] @ weights_fuzzy[:n_common]
+
+    alt_scores = {}
+    for alt, total_score in zip(alternatives, total_scores.tolist()):
         # Сохраняем с приведением типов
         alt_scores[alt] = {
             "score": float(round(total_score, 4)),
@@ -139,6 +463,165 @@ def process_fuzzy_ahp_type1(
     return alt_scores
 
 
+# ===================== TYPE-1: АНАЛИЗ ЧУВСТВИТЕЛЬНОСТИ =====================
+
+def sample_triangular(tfns: np.ndarray, n_samples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Выборки из треугольных распределений TFN (..., 3) методом обратной функции
+    распределения; вырожденные TFN (l = u) дают постоянное значение.
+    Возвращает массив (n_samples, ...).
+    """
+    low, mode, high = tfns[..., 0], tfns[..., 1], tfns[..., 2]
+    width = high - low
+    u = rng.random((n_samples,) + tfns.shape[:-1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        split = np.where(width > 0, (mode - low) / width, 0.0)
+    left = low + np.sqrt(u * width * (mode - low))
+    right = high - np.sqrt((1 - u) * width * (high - mode))
+    return np.where(u < split, left, right)
+
+
+def _sensitivity_chunk(args) -> Tuple[np.ndarray, np.ndarray]:
+    """Веса критериев и итоговые оценки для пакета выборок (исполняется и в процессах пула)"""
+    upper_tfns, rows, cols, n_crit, rating_tfns, row_weights, segment_starts, n_common, method, n_samples, seed = args
+    rng = np.random.default_rng(seed)
+
+    # Матрицы сравнений (выборки, n, n): верхний треугольник из TFN, нижний — обратные значения
+    matrices = np.ones((n_samples, n_crit, n_crit))
+    sampled = sample_triangular(upper_tfns, n_samples, rng)
+    matrices[:, rows, cols] = sampled
+    matrices[:, cols, rows] = 1 / sampled
+
+    if method == "geometric":
+        weights = np.exp(np.log(matrices).mean(axis=2))
+        weights /= weights.sum(axis=1, keepdims=True)
+    else:
+        weights = np.full((n_samples, n_crit), 1.0 / n_crit)
+        for _ in range(1000):
+            updated = np.einsum("sij,sj->si", matrices, weights)
+            updated /= updated.sum(axis=1, keepdims=True)
+            converged = np.abs(updated - weights).max() < 1e-10
+            weights = updated
+            if converged:
+                break
+
+    # Оценки строк файла альтернатив (выборки, строки, критерии), строки упорядочены по альтернативам;
+    # взвешенная агрегация по экспертам — сумма по сегментам строк каждой альтернативы
+    ratings = sample_triangular(rating_tfns[:, :n_common], n_samples, rng)
+    crit_scores = np.add.reduceat(ratings * row_weights[np.newaxis, :, np.newaxis], segment_starts, axis=1)
+    scores = np.einsum("sac,sc->sa", crit_scores, weights[:, :n_common])
+    return weights, scores
+
+
+def fuzzy_ahp_type1_sensitivity(
+        criteria_path: str,
+        alternatives_path: str,
+        weights_path: str,
+        n_samples: int = 1000,
+        weight_method: str = "geometric",
+        percentiles: Tuple[float, ...] = (5, 50, 95),
+        max_chunk_elements: int = 20_000_000,
+        workers: Union[int, None] = None,
+        parallel_threshold: int = 20_000,
+        seed: Union[int, None] = None
+) -> Dict[str, Dict[str, object]]:
+    """
+    Анализ чувствительности Type-1 Fuzzy AHP методом Монте-Карло.
+
+    Вместо дефаззификации каждая оценка (матрица критериев и оценки
+    альтернатив) выбирается из своего треугольного распределения; веса
+    критериев и итоговые оценки считаются сразу для пакета выборок
+    (weight_method: "geometric" или "eigenvector" по четким выборкам).
+    Пакеты содержат не более max_chunk_elements чисел; при n_samples >=
+    parallel_threshold они распределяются по пулу из workers процессов.
+    Каждый пакет получает собственный поток случайных чисел от seed,
+    поэтому результат не зависит от числа процессов.
+
+    Возвращает {"alternatives": {альтернатива: статистика оценок и рангов},
+    "criteria": {критерий: статистика весов}}.
+    """
+    if weight_method not in ("geometric", "eigenvector"):
+        raise ValueError(f"Неизвестный метод расчета весов '{weight_method}'. "
+                         f"Допустимые: ['geometric', 'eigenvector']")
+
+    expert_weights = load_expert_weights(weights_path)
+    ratings = load_alternative_ratings(alternatives_path)
+    criteria_names, fuzzy_matrix = load_criteria_matrix(criteria_path)
+    point = process_fuzzy_ahp_type1(criteria_path, alternatives_path, weights_path)
+
+    # Вес строки: вес эксперта / сумма весов экспертов альтернативы; строки группируются по альтернативам
+    alt_idx, alternatives = pd.factorize(ratings["alternatives"])
+    row_weights = np.array([expert_weights.get(expert, 0.0) for expert in ratings["experts"].tolist()])
+    total_weight = np.bincount(alt_idx, weights=row_weights, minlength=len(alternatives))
+    row_weights = np.divide(row_weights, total_weight[alt_idx],
+                            out=np.zeros_like(row_weights), where=total_weight[alt_idx] > 0)
+    order = np.argsort(alt_idx, kind="stable")
+    segment_starts = np.r_[0, np.cumsum(np.bincount(alt_idx))[:-1]]
+
+    n_crit = len(criteria_names)
+    n_common = min(n_crit, ratings["tfns"].shape[1])
+    rows, cols = np.triu_indices(n_crit, k=1)
+
+    per_sample = max(n_crit * n_crit + 2 * ratings["tfns"][..., 0].size, 1)
+    chunk_size = max(1, min(n_samples, max_chunk_elements // per_sample))
+    starts = list(range(0, n_samples, chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    upper_tfns, rating_tfns, row_weights = fuzzy_matrix[rows, cols], ratings["tfns"][order], row_weights[order]
+    tasks = [
+        (upper_tfns, rows, cols, n_crit, rating_tfns, row_weights, segment_starts, n_common,
+         weight_method, min(chunk_size, n_samples - start), chunk_seed)
+        for start, chunk_seed in zip(starts, seeds)
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    if n_samples >= parallel_threshold and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            chunks = list(pool.map(_sensitivity_chunk, tasks))
+    else:
+        chunks = [_sensitivity_chunk(task) for task in tasks]
+
+    weights = np.concatenate([chunk[0] for chunk in chunks])
+    scores = np.concatenate([chunk[1] for chunk in chunks])
+
+    # Ранги в каждой выборке (1 — лучшая альтернатива)
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    np.put_along_axis(ranks, np.argsort(-scores, axis=1, kind="stable"),
+                      np.arange(1, len(alternatives) + 1)[np.newaxis, :], axis=1)
+    point_scores = np.array([point[alt]["score"] for alt in alternatives])
+    point_ranks = np.empty(len(alternatives), dtype=np.int64)
+    point_ranks[np.argsort(-point_scores, kind="stable")] = np.arange(1, len(alternatives) + 1)
+
+    score_bands = np.percentile(scores, percentiles, axis=0)
+    weight_bands = np.percentile(weights, percentiles, axis=0)
+    mean_scores = scores.mean(axis=0)
+
+    return {
+        "alternatives": {
+            alt: {
+                "score": point[alt]["score"],
+                "rank": int(point_ranks[i]),
+                "mean": round(float(mean_scores[i]), 4),
+                "std": round(float(scores[:, i].std()), 4),
+                "percentiles": {p: round(float(score_bands[j, i]), 4) for j, p in enumerate(percentiles)},
+                "mean_rank": round(float(ranks[:, i].mean()), 2),
+                "rank_range": (int(ranks[:, i].min()), int(ranks[:, i].max())),
+                "rank_stability": round(float(np.mean(ranks[:, i] == point_ranks[i])), 4),
+                "top_probability": round(float(np.mean(ranks[:, i] == 1)), 4),
+                "comment": f"Итоговый приоритет: {round(float(mean_scores[i]), 4)} (среднее по выборкам)"
+            }
+            for i, alt in enumerate(alternatives.tolist())
+        },
+        "criteria": {
+            crit: {
+                "mean": round(float(weights[:, j].mean()), 4),
+                "std": round(float(weights[:, j].std()), 4),
+                "percentiles": {p: round(float(weight_bands[k, j]), 4) for k, p in enumerate(percentiles)}
+            }
+            for j, crit in enumerate(criteria_names)
+        }
+    }
+
+
 # ============================ TYPE-2 ============================
 
 def fuzzy_saaty_type2_scale() -> Dict[str, Tuple[Tuple[float, ...], Tuple[float, ...]]]:
@@ -151,24 +634,65 @@ def fuzzy_saaty_type2_scale() -> Dict[str, Tuple[Tuple[float, ...], Tuple[float,
     }
 
 
+# Шкала компилируется один раз при импорте: метка → код и трапеции (метки, 4)
+TYPE2_SCALE = fuzzy_saaty_type2_scale()
+TYPE2_LABELS = list(TYPE2_SCALE)
+TYPE2_CODES = {label: code for code, label in enumerate(TYPE2_LABELS)}
+TYPE2_LOWER = np.array([bounds[0] for bounds in TYPE2_SCALE.values()])
+TYPE2_UPPER = np.array([bounds[1] for bounds in TYPE2_SCALE.values()])
+
+
 def parse_type2_label(label: str) -> Tuple[np.ndarray, np.ndarray]:
     """Парсит метки Type-2 в нижние и верхние функции принадлежности"""
-    scale = fuzzy_saaty_type2_scale()
     label = str(label).strip().strip('"').capitalize()
-    if label not in scale:
-        raise ValueError(f"Неверная оценка '{label}'. Допустимые: {list(scale.keys())}")
-    return np.array(scale[label][0]), np.array(scale[label][1])
+    if label not in TYPE2_CODES:
+        raise ValueError(f"Неверная оценка '{label}'. Допустимые: {TYPE2_LABELS}")
+    code = TYPE2_CODES[label]
+    return TYPE2_LOWER[code].copy(), TYPE2_UPPER[code].copy()
+
+
+def encode_type2_labels(values: np.ndarray, columns: List[str], allow_empty: bool = False) -> np.ndarray:
+    """
+    Переводит метки Type-2 формы (строки, столбцы) в индексы шкалы TYPE2_LABELS.
+    Каждая уникальная метка разбирается один раз; пустые ячейки при allow_empty дают -1.
+    """
+    value_codes, uniques = pd.factorize(values.ravel(), use_na_sentinel=False)
+    unique_codes = np.empty(len(uniques), dtype=np.int64)
+    for k, raw in enumerate(uniques):
+        label = str(raw).strip().strip('"').capitalize()
+        if allow_empty and (pd.isna(raw) or not label):
+            unique_codes[k] = -1
+        elif label in TYPE2_CODES:
+            unique_codes[k] = TYPE2_CODES[label]
+        else:
+            row, col = divmod(int(np.flatnonzero(value_codes == k)[0]), len(columns))
+            raise ValueError(
+                f"Неверная оценка '{label}' в столбце '{columns[col]}' (строка {row + 1}). "
+                f"Допустимые: {TYPE2_LABELS}"
+            )
+    return unique_codes[value_codes].reshape(values.shape)
+
+
+def type2_scale_arrays() -> Tuple[np.ndarray, np.ndarray]:
+    """Нижние и верхние трапеции шкалы Type-2 в виде массивов (метки, 4)"""
+    return TYPE2_LOWER, TYPE2_UPPER
 
 
 def defuzzify_type2(lower: np.ndarray, upper: np.ndarray) -> float:
-    """Дефаззификация интервального Type-2 нечеткого числа"""
-    c1 = np.mean([lower[0], lower[1], lower[3]])
-    c2 = np.mean([upper[0], upper[2], upper[3]])
+    """Дефаззификация интервального Type-2 нечеткого числа (или массива чисел по последней оси)"""
+    lower, upper = np.asarray(lower), np.asarray(upper)
+    c1 = (lower[..., 0] + lower[..., 1] + lower[..., 3]) / 3
+    c2 = (upper[..., 0] + upper[..., 2] + upper[..., 3]) / 3
     return (c1 + c2) / 2
 
 
-def process_fuzzy_ahp_type2(filepath: str) -> Dict[str, float]:
-    """Основная функция обработки для Type-2 Fuzzy AHP"""
+def process_fuzzy_ahp_type2(filepath: str, weight_method: str = "normalization",
+                            max_cr: float = None) -> Dict[str, float]:
+    """
+    Основная функция обработки для Type-2 Fuzzy AHP.
+    weight_method: "normalization" (нормализация столбцов) или "eigenvector";
+    при заданном max_cr несогласованная матрица отклоняется.
+    """
 
     df = pd.read_csv(filepath, quotechar='"')
 
@@ -190,40 +714,34 @@ def process_fuzzy_ahp_type2(filepath: str) -> Dict[str, float]:
                        for c in col.split(" > ")})
     n = len(criteria)
 
-    # Агрегация оценок экспертов
-    aggregated = {}
-    for col in comparison_cols:
-        lower_sums = np.zeros(4)
-        upper_sums = np.zeros(4)
-        total_weight = 0.0
-
-        for _, row in df.iterrows():
-            weight = float(row["Вес"])
-            lower, upper = parse_type2_label(row[col])
-            lower_sums += lower * weight
-            upper_sums += upper * weight
-            total_weight += weight
-
-        if total_weight > 0:
-            aggregated[col] = (
-                lower_sums / total_weight,
-                upper_sums / total_weight
-            )
+    # Агрегация оценок экспертов: коды меток (эксперты, сравнения) → трапеции (эксперты, сравнения, 4)
+    codes = encode_type2_labels(df[comparison_cols].to_numpy(), comparison_cols)
+    expert_weights = df["Вес"].astype(float).to_numpy()
+    lower = np.einsum("e,eck->ck", expert_weights, TYPE2_LOWER[codes]) / total_weight
+    upper = np.einsum("e,eck->ck", expert_weights, TYPE2_UPPER[codes]) / total_weight
+    crisp = defuzzify_type2(lower, upper)
 
     # Построение матрицы парных сравнений
     matrix = np.eye(n)
     crit_to_idx = {crit: i for i, crit in enumerate(criteria)}
+    pair_idx = np.array([[crit_to_idx[c] for c in col.split(" > ")] for col in comparison_cols],
+                        dtype=np.int64).reshape(-1, 2)
+    # Прямое и обратное значение каждой пары чередуются, чтобы повторы перезаписывались по порядку столбцов
+    rows = np.column_stack([pair_idx[:, 0], pair_idx[:, 1]]).ravel()
+    cols = np.column_stack([pair_idx[:, 1], pair_idx[:, 0]]).ravel()
+    matrix[rows, cols] = np.column_stack([crisp, 1 / crisp]).ravel()
 
-    for pair, (lower, upper) in aggregated.items():
-        a, b = pair.split(" > ")
-        i, j = crit_to_idx[a], crit_to_idx[b]
-        crisp_val = defuzzify_type2(lower, upper)
-        matrix[i, j] = crisp_val
-        matrix[j, i] = 1 / crisp_val
+    check_consistency(matrix, max_cr)
 
     # Вычисление весов критериев
-    normalized = matrix / matrix.sum(axis=0)
-    weights = normalized.mean(axis=1)
-    weights /= weights.sum()  # Нормализация к сумме 1
+    if weight_method == "eigenvector":
+        weights, _ = principal_eigenvector(matrix)
+    elif weight_method == "normalization":
+        normalized = matrix / matrix.sum(axis=0)
+        weights = normalized.mean(axis=1)
+        weights /= weights.sum()  # Нормализация к сумме 1
+    else:
+        raise ValueError(f"Неизвестный метод расчета весов '{weight_method}'. "
+                         f"Допустимые: ['normalization', 'eigenvector']")
 
     return {crit: float(weight) for crit, weight in zip(criteria, weights)}
\ No newline at end of file
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
-import re
+
+from prioritization_tool.logic.ifs_parsing import clean_string, parse_ifs_value, parse_ifs_frame
+from prioritization_tool.logic.parse_cache import cached_parse
 
 # Лингвистические оценки с модификаторами уверенности
 LINGUISTIC_IT2FS = {
@@ -19,16 +21,32 @@ CONFIDENCE_MODIFIER = {
 }
 
 
-def clean_string(s):
-    """Очистка строки от кавычек и лишних пробелов"""
-    return str(s).strip().strip('"\'') if pd.notna(s) else ""
+def build_it2fs_table():
+    """
+    Таблица IT2FS для всех сочетаний уверенности и значения.
+    Код строки: индекс_уверенности * число_значений + индекс_значения;
+    последняя строка — нулевая оценка для пустых ячеек.
+    """
+    base = np.array(list(LINGUISTIC_IT2FS.values()))
+    mods = np.array(list(CONFIDENCE_MODIFIER.values()))[:, np.newaxis, np.newaxis]
 
+    lower = np.maximum(0, base[np.newaxis, :, :2] - mods)
+    upper = np.minimum(1, base[np.newaxis, :, 2:] + mods)
+    table = np.concatenate([lower, upper], axis=2).reshape(-1, 4)
+    return np.vstack([table, np.zeros(4)])
 
-def parse_linguistic_it2fs(s):
-    """Парсинг лингвистических оценок в IT2FS"""
+
+IT2FS_TABLE = build_it2fs_table()
+IT2FS_EMPTY_CODE = len(IT2FS_TABLE) - 1
+_VALUE_CODES = {label: i for i, label in enumerate(LINGUISTIC_IT2FS)}
+_CONFIDENCE_CODES = {label: i for i, label in enumerate(CONFIDENCE_MODIFIER)}
+
+
+def it2fs_code(s):
+    """Код лингвистической оценки в IT2FS_TABLE"""
     s_clean = clean_string(s)
     if not s_clean:
-        return np.array([0, 0, 0, 0])
+        return IT2FS_EMPTY_CODE
 
     try:
         # Разделяем на уверенность и значение
@@ -37,48 +55,106 @@ def parse_linguistic_it2fs(s):
             raise ValueError(f"Неверный формат оценки: {s_clean}")
 
         conf_part, value_part = parts
-        base = LINGUISTIC_IT2FS[value_part]
-        mod = CONFIDENCE_MODIFIER[conf_part]
+        value_code = _VALUE_CODES[value_part]
+        conf_code = _CONFIDENCE_CODES[conf_part]
 
-        lower = (max(0, base[0] - mod), max(0, base[1] - mod))
-        upper = (min(1, base[2] + mod), min(1, base[3] + mod))
-
-        return np.array([lower[0], lower[1], upper[0], upper[1]])
+        return conf_code * len(_VALUE_CODES) + value_code
     except KeyError as e:
         raise ValueError(f"Неизвестное значение в оценке '{s_clean}': {str(e)}")
     except Exception as e:
         raise ValueError(f"Ошибка при разборе оценки '{s_clean}': {str(e)}")
 
 
+def parse_linguistic_it2fs(s):
+    """Парсинг лингвистических оценок в IT2FS"""
+    return IT2FS_TABLE[it2fs_code(s)].copy()
+
+
+def encode_it2fs(df, criteria_cols):
+    """Коды IT2FS формы (строки, критерии): каждая уникальная строка разбирается один раз"""
+    value_codes, uniques = pd.factorize(df[criteria_cols].to_numpy().ravel(), use_na_sentinel=False)
+    unique_codes = np.array([it2fs_code(u) for u in uniques], dtype=np.int64)
+    return unique_codes[value_codes].reshape(len(df), len(criteria_cols))
+
+
+def group_by_alternative(alternatives):
+    """
+    Сегменты строк по альтернативам для сегментированных редукций:
+    отсортированные имена, перестановка строк и начала сегментов
+    """
+    names, inverse = np.unique(alternatives, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    starts = np.searchsorted(inverse[order], np.arange(len(names)))
+    return names, order, starts
+
+
+def weighted_group_means(values, weights, order, starts):
+    """Взвешенные средние значений (строки, ...) по сегментам альтернатив"""
+    sorted_weights = weights[order]
+    weighted = values[order] * sorted_weights.reshape((-1,) + (1,) * (values.ndim - 1))
+    sums = np.add.reduceat(weighted, starts, axis=0)
+    weight_sums = np.add.reduceat(sorted_weights, starts)
+    if np.any(weight_sums == 0):
+        raise ValueError("Сумма весов экспертов для альтернативы равна нулю")
+    return sums / weight_sums.reshape((-1,) + (1,) * (values.ndim - 1))
+
+
+def _load_delphi_panel(filepath, kind):
+    # Чтение CSV с обработкой кавычек
+    df = pd.read_csv(filepath, quotechar='"')
+
+    # Нормализация названий столбцов
+    df.columns = [clean_string(col) for col in df.columns]
+
+    # Проверка обязательных столбцов
+    required = {"Альтернатива", "Эксперт", "Вес эксперта"}
+    missing = required - set(df.columns)
+    if missing:
+        raise ValueError(f"Отсутствуют обязательные столбцы: {missing}")
+
+    criteria_cols = [col for col in df.columns if col not in required]
+    if kind == "it2fs":
+        values = IT2FS_TABLE[encode_it2fs(df, criteria_cols)]
+    else:
+        values = parse_ifs_frame(df, criteria_cols, validate=True)
+
+    return {
+        "alternatives": df["Альтернатива"].astype(str).to_numpy(dtype=str),
+        "experts": df["Эксперт"].astype(str).to_numpy(dtype=str),
+        "weights": df["Вес эксперта"].astype(float).to_numpy(),
+        "criteria": np.array(criteria_cols, dtype=str),
+        "values": values,
+    }
+
+
+def load_delphi_panel(filepath, kind="it2fs"):
+    """
+    Разобранная панель Delphi через кэш разбора: 'alternatives', 'experts' и 'weights' по строкам,
+    'criteria' и массив оценок 'values' формы (строки, критерии, 4) для IT2FS
+    или (строки, критерии, 3) для IFS
+    """
+    # Версия 2: в панель добавлены эксперты
+    return cached_parse(f"fuzzy_delphi.{kind}", filepath,
+                        lambda path: _load_delphi_panel(path, kind), version=2)
+
+
 def process_fuzzy_delphi(filepath):
     """Обработка файла с лингвистическими оценками (Fuzzy Delphi IT2FS)"""
     try:
-        # Чтение CSV с обработкой кавычек
-        df = pd.read_csv(filepath, quotechar='"')
-
-        # Нормализация названий столбцов
-        df.columns = [clean_string(col) for col in df.columns]
+        panel = load_delphi_panel(filepath, kind="it2fs")
+        criteria_cols = panel["criteria"].tolist()
+        alternatives, order, starts = group_by_alternative(panel["alternatives"])
 
-        # Проверка обязательных столбцов
-        required = {"Альтернатива", "Эксперт", "Вес эксперта"}
-        missing = required - set(df.columns)
-        if missing:
-            raise ValueError(f"Отсутствуют обязательные столбцы: {missing}")
+        # Взвешенные средние сразу для всех (альтернатива, критерий)
+        means = weighted_group_means(panel["values"], panel["weights"], order, starts)
+        fous = means[:, :, 3] - means[:, :, 0]  # Размах неопределенности
 
-        criteria_cols = [col for col in df.columns if col not in required]
-        grouped = df.groupby("Альтернатива")
         results = {}
-
-        for alt, group in grouped:
+        for a, alt in enumerate(alternatives.tolist()):
             crit_result = {}
-            for crit in criteria_cols:
-                values = group[crit].apply(parse_linguistic_it2fs).tolist()
-                weights = group["Вес эксперта"].astype(float).to_numpy()
-                values = np.array(values)
-
-                # Взвешенное среднее
-                mean = np.average(values, axis=0, weights=weights)
-                fou = mean[3] - mean[0]  # Размах неопределенности
+            for j, crit in enumerate(criteria_cols):
+                mean = means[a, j]
+                fou = fous[a, j]
 
                 crit_result[crit] = {
                     "mean": tuple(np.round(mean, 3)),
@@ -100,71 +176,39 @@ def process_fuzzy_delphi(filepath):
 
 def parse_ifs(s):
     """Парсинг строк вида (μ, ν, π) в массив"""
-    s_clean = clean_string(s)
-    if not s_clean:
-        return np.array([0, 0, 0])
-
-    try:
-        # Удаляем все скобки и кавычки
-        s_clean = re.sub(r'[()"\']', '', s_clean)
-        numbers = list(map(float, re.findall(r"[-+]?\d*\.\d+|\d+", s_clean)))
-
-        if len(numbers) != 3:
-            raise ValueError(f"Ожидалось 3 числа, получено {len(numbers)}")
-
-        # Проверка допустимости значений
-        if not (0 <= numbers[0] <= 1 and 0 <= numbers[1] <= 1 and 0 <= numbers[2] <= 1):
-            raise ValueError("Значения должны быть в диапазоне [0, 1]")
-
-        if not np.isclose(sum(numbers), 1.0, atol=0.01):
-            raise ValueError(f"Сумма значений должна быть ~1.0 (получено {sum(numbers)})")
-
-        return np.array(numbers)
-    except Exception as e:
-        raise ValueError(f"Ошибка при разборе IFS '{s_clean}': {str(e)}")
+    return parse_ifs_value(s, validate=True)
 
 
 def process_delphi_ifs(filepath):
     """Обработка файла с IFS-оценками (Delphi Intuitionistic)"""
     try:
-        # Чтение CSV с обработкой кавычек
-        df = pd.read_csv(filepath, quotechar='"')
+        panel = load_delphi_panel(filepath, kind="ifs")
+        criteria_cols = panel["criteria"].tolist()
+        alternatives, order, starts = group_by_alternative(panel["alternatives"])
 
-        # Нормализация названий столбцов
-        df.columns = [clean_string(col) for col in df.columns]
+        # Взвешенные средние и размах π сразу для всех (альтернатива, критерий)
+        means = weighted_group_means(panel["values"], panel["weights"], order, starts)
+        pi_values = panel["values"][order][:, :, 2]  # Параметры неопределенности
+        fous = np.maximum.reduceat(pi_values, starts, axis=0) - np.minimum.reduceat(pi_values, starts, axis=0)
 
-        # Проверка обязательных столбцов
-        required = {"Альтернатива", "Эксперт", "Вес эксперта"}
-        missing = required - set(df.columns)
-        if missing:
-            raise ValueError(f"Отсутствуют обязательные столбцы: {missing}")
+        # Средняя неопределенность по экспертам и критериям каждой альтернативы
+        counts = np.diff(np.append(starts, len(order)))
+        avg_pis = np.add.reduceat(pi_values.sum(axis=1), starts) / (counts * len(criteria_cols))
 
-        criteria_cols = [col for col in df.columns if col not in required]
-        grouped = df.groupby("Альтернатива")
         results = {}
-
-        for alt, group in grouped:
+        for a, alt in enumerate(alternatives.tolist()):
             crit_result = {}
-            expert_pis = []
-            weights = group["Вес эксперта"].astype(float).to_numpy()
-
-            for crit in criteria_cols:
-                values = group[crit].apply(parse_ifs).tolist()
-                values = np.array(values)
-
-                # Взвешенное среднее
-                mean = np.average(values, axis=0, weights=weights)
-                pi_values = values[:, 2]  # Параметры неопределенности
-                fou = np.max(pi_values) - np.min(pi_values)  # Размах неопределенности
+            for j, crit in enumerate(criteria_cols):
+                mean = means[a, j]
+                fou = fous[a, j]
 
                 crit_result[crit] = {
                     "mean": tuple(np.round(mean, 3)),
                     "fou": round(fou, 3)
                 }
-                expert_pis.extend(pi_values)
 
             # Индекс уверенности (1 - средняя неопределенность)
-            avg_pi = np.mean(expert_pis)
+            avg_pi = avg_pis[a]
             results[alt] = {
                 "criteria": crit_result,
                 "confidence_index": round(1 - avg_pi, 3)
@@ -173,4 +217,101 @@ def process_delphi_ifs(filepath):
         return results
 
     except Exception as e:
-        raise ValueError(f"Ошибка обработки файла Delphi Intuitionistic: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Ошибка обработки файла Delphi Intuitionistic: {str(e)}")
+
+
+def diagnose_delphi_panel(filepath, kind="it2fs", consensus_threshold=0.2,
+                          outlier_z=2.0, block_alternatives=256):
+    """
+    Диагностика согласованности панели Delphi (kind: "it2fs" или "ifs").
+
+    Для каждой оценки считается вершинное расстояние до взвешенного среднего
+    панели; средние расстояния экспертов ранжируются, эксперты с z-оценкой
+    выше outlier_z помечаются как выбросы. Матрица попарной согласованности
+    экспертов (1 - среднеквадратичное расстояние по общим оценкам) строится
+    матричными произведениями по блокам из block_alternatives альтернатив.
+    Процент консенсуса — доля экспертов с расстоянием до среднего не более
+    consensus_threshold.
+    """
+    try:
+        panel = load_delphi_panel(filepath, kind=kind)
+        values = panel["values"]
+        n_rows, n_crit, width = values.shape
+        criteria_cols = panel["criteria"].tolist()
+
+        alternatives, order, starts = group_by_alternative(panel["alternatives"])
+        counts = np.diff(np.append(starts, n_rows))
+        alt_of_row = np.empty(n_rows, dtype=np.int64)
+        alt_of_row[order] = np.repeat(np.arange(len(alternatives)), counts)
+        expert_of_row, experts = pd.factorize(panel["experts"])
+        experts = experts.tolist()
+        n_experts = len(experts)
+
+        # Расстояние каждой оценки до взвешенного среднего панели
+        means = weighted_group_means(values, panel["weights"], order, starts)
+        distances = np.sqrt(np.mean((values - means[alt_of_row]) ** 2, axis=-1))
+
+        ratings_per_expert = np.bincount(expert_of_row, minlength=n_experts) * n_crit
+        expert_distance = np.bincount(expert_of_row, weights=distances.sum(axis=1),
+                                      minlength=n_experts) / ratings_per_expert
+        spread = expert_distance.std()
+        z_scores = (expert_distance - expert_distance.mean()) / spread if spread > 0 else np.zeros(n_experts)
+
+        # Доля экспертов в пределах порога для каждой (альтернатива, критерий)
+        within = (distances <= consensus_threshold)[order]
+        consensus = np.add.reduceat(within, starts, axis=0) / counts[:, np.newaxis]
+
+        # Попарные расстояния: ||x - y||^2 = |x|^2 + |y|^2 - 2 x·y по общим альтернативам
+        gram = np.zeros((n_experts, n_experts))
+        own_squares = np.zeros((n_experts, n_experts))
+        common = np.zeros((n_experts, n_experts))
+        for first in range(0, len(alternatives), block_alternatives):
+            last = min(first + block_alternatives, len(alternatives))
+            row_stop = starts[last] if last < len(alternatives) else n_rows
+            rows = order[starts[first]:row_stop]
+            local_alt = alt_of_row[rows] - first
+
+            block = np.zeros((n_experts, last - first, n_crit, width))
+            present = np.zeros((n_experts, last - first))
+            block[expert_of_row[rows], local_alt] = values[rows]
+            present[expert_of_row[rows], local_alt] = 1.0
+
+            flat = block.reshape(n_experts, -1)
+            gram += flat @ flat.T
+            own_squares += (block ** 2).sum(axis=(2, 3)) @ present.T
+            common += present @ present.T
+
+        squared = np.maximum(own_squares + own_squares.T - 2 * gram, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pair_distance = np.sqrt(squared / (common * n_crit * width))
+        pair_distance[common == 0] = np.nan
+        agreement = 1 - pair_distance
+
+        ranking = np.argsort(-expert_distance, kind="stable")
+        expert_report = {
+            experts[e]: {
+                "distance": round(float(expert_distance[e]), 3),
+                "z_score": round(float(z_scores[e]), 3),
+                "outlier": bool(z_scores[e] > outlier_z)
+            }
+            for e in ranking
+        }
+
+        consensus_report = {}
+        for a, alt in enumerate(alternatives.tolist()):
+            consensus_report[alt] = {
+                "criteria": {crit: round(float(consensus[a, j]) * 100, 2)
+                             for j, crit in enumerate(criteria_cols)},
+                "consensus": round(float(consensus[a].mean()) * 100, 2)
+            }
+
+        return {
+            "experts": expert_report,
+            "outliers": [expert for expert, info in expert_report.items() if info["outlier"]],
+            "agreement": {"experts": experts, "matrix": np.round(agreement, 3)},
+            "consensus": consensus_report,
+            "panel_consensus": round(float(consensus.mean()) * 100, 2)
+        }
+
+    except Exception as e:
+        raise ValueError(f"Ошибка диагностики панели Delphi: {str(e)}")
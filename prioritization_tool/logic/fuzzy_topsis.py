@@ -2,6 +2,11 @@ import pandas as pd
 import numpy as np
 import re
 
+from prioritization_tool.logic.linguistic_codes import (
+    compile_scale, scale_to_arrays, scale_from_arrays, load_label_matrix, encode_labels
+)
+from prioritization_tool.logic.parse_cache import cached_parse
+
 
 def parse_trapezoid(value):
     numbers = list(map(float, re.findall(r"[-+]?\d*\.?\d+", value)))
@@ -22,19 +27,37 @@ def parse_fuzzy_scale(scale_path):
     return scale_dict
 
 
+def compile_fuzzy_scale(scale_path):
+    """Шкала в виде плотной таблицы трапеций (метки, 4) и отображения метка → код"""
+    entry = cached_parse(
+        "fuzzy_topsis.scale", scale_path,
+        lambda path: scale_to_arrays(*compile_scale(parse_fuzzy_scale(path)))
+    )
+    return scale_from_arrays(entry)
+
+
 def normalize_fuzzy_matrix(fuzzy_matrix):
-    n_alts, n_criteria = fuzzy_matrix.shape[:2]
-    normalized = np.zeros_like(fuzzy_matrix)
-    for j in range(n_criteria):
-        col_max = np.max(fuzzy_matrix[:, j, 3])
-        for i in range(n_alts):
-            a, b, c, d = fuzzy_matrix[i, j]
-            normalized[i, j] = np.array([a / col_max, b / col_max, c / col_max, d / col_max])
-    return normalized
+    """Нормализация тензора (альтернативы, критерии, 4) на максимум d по каждому критерию"""
+    col_max = np.max(fuzzy_matrix[:, :, 3], axis=0)
+    return fuzzy_matrix / col_max[np.newaxis, :, np.newaxis]
 
 
 def fuzzy_distance(a, b):
-    return np.sqrt(np.sum((a - b) ** 2) / 4)
+    """Вершинное расстояние между трапециями (по последней оси)"""
+    return np.sqrt(np.sum((a - b) ** 2, axis=-1) / 4)
+
+
+def fuzzy_closeness(fuzzy_matrix):
+    """Коэффициенты близости Fuzzy TOPSIS для тензора (альтернативы, критерии, 4)"""
+    norm_matrix = normalize_fuzzy_matrix(fuzzy_matrix)
+
+    F_plus = np.max(norm_matrix, axis=0)
+    F_minus = np.min(norm_matrix, axis=0)
+
+    D_plus = np.sqrt(np.sum(fuzzy_distance(norm_matrix, F_plus) ** 2, axis=1))
+    D_minus = np.sqrt(np.sum(fuzzy_distance(norm_matrix, F_minus) ** 2, axis=1))
+
+    return D_minus / (D_plus + D_minus)
 
 
 def interpret_score(score):
@@ -47,42 +70,67 @@ def interpret_score(score):
 
 
 def calculate_fuzzy_topsis(input_path: str, scale_path: str) -> dict:
+    table, label_to_code = compile_fuzzy_scale(scale_path)
+    alt_names, codes = load_label_matrix(input_path, label_to_code)
+
+    C = fuzzy_closeness(table[codes])
+
+    return {
+        alt: {"score": round(float(score), 4), "comment": interpret_score(score)}
+        for alt, score in zip(alt_names, C)
+    }
+
+
+def aggregate_expert_tensor(expert_tensor, expert_weights):
+    """
+    Взвешенная агрегация оценок экспертов.
+    expert_tensor: (эксперты, альтернативы, критерии, 4)
+    expert_weights: (эксперты, альтернативы) — 0 там, где эксперт не оценивал альтернативу
+    Возвращает тензор (альтернативы, критерии, 4).
+    """
+    weight_sums = expert_weights.sum(axis=0)
+    if np.any(weight_sums <= 0):
+        raise ValueError("Для каждой альтернативы сумма весов экспертов должна быть положительной")
+    aggregated = np.einsum("ea,eack->ack", expert_weights, expert_tensor)
+    return aggregated / weight_sums[:, np.newaxis, np.newaxis]
+
+
+def calculate_group_fuzzy_topsis(input_path: str, scale_path: str) -> dict:
+    """
+    Групповой Fuzzy TOPSIS по CSV в длинном формате:
+    Альтернатива, Эксперт, критерии..., Вес эксперта.
+    Оценки всех экспертов собираются в тензор (эксперты, альтернативы, критерии, 4),
+    агрегируются взвешенным средним и оцениваются за один проход.
+    """
     df = pd.read_csv(input_path)
-    scale = parse_fuzzy_scale(scale_path)
+    required = ["Альтернатива", "Эксперт", "Вес эксперта"]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        raise ValueError(f"Отсутствуют обязательные столбцы: {missing}")
 
-    fuzzy_matrix = []
-    alt_names = []
-    for _, row in df.iterrows():
-        alt_names.append(row["Альтернатива"])
-        alt_values = []
-        for col in df.columns[1:]:
-            key = str(row[col]).strip()
-            if key not in scale:
-                raise ValueError(f"Недопустимое значение '{key}' в столбце '{col}'")
-            alt_values.append(scale[key])
-        fuzzy_matrix.append(alt_values)
-
-    fuzzy_matrix = np.array(fuzzy_matrix)
-    norm_matrix = normalize_fuzzy_matrix(fuzzy_matrix)
+    table, label_to_code = compile_fuzzy_scale(scale_path)
+    criteria_cols = [col for col in df.columns if col not in required]
+    codes = encode_labels(df, criteria_cols, label_to_code)
 
-    F_plus = np.max(norm_matrix, axis=0)
-    F_minus = np.min(norm_matrix, axis=0)
+    alt_idx, alt_names = pd.factorize(df["Альтернатива"])
+    exp_idx, experts = pd.factorize(df["Эксперт"])
 
-    D_plus = np.array([
-        np.sqrt(np.sum([fuzzy_distance(norm_matrix[i, j], F_plus[j]) ** 2
-                        for j in range(norm_matrix.shape[1])]))
-        for i in range(norm_matrix.shape[0])
-    ])
+    duplicated = pd.Series(alt_idx * len(experts) + exp_idx).duplicated().to_numpy()
+    if duplicated.any():
+        row = int(np.flatnonzero(duplicated)[0])
+        raise ValueError(
+            f"Повторная оценка эксперта '{df['Эксперт'].iloc[row]}' "
+            f"для альтернативы '{df['Альтернатива'].iloc[row]}' (строка {row + 1})"
+        )
 
-    D_minus = np.array([
-        np.sqrt(np.sum([fuzzy_distance(norm_matrix[i, j], F_minus[j]) ** 2
-                        for j in range(norm_matrix.shape[1])]))
-        for i in range(norm_matrix.shape[0])
-    ])
+    expert_tensor = np.zeros((len(experts), len(alt_names), len(criteria_cols), 4))
+    expert_tensor[exp_idx, alt_idx] = table[codes]
+    expert_weights = np.zeros((len(experts), len(alt_names)))
+    expert_weights[exp_idx, alt_idx] = df["Вес эксперта"].astype(float).to_numpy()
 
-    C = D_minus / (D_plus + D_minus)
+    C = fuzzy_closeness(aggregate_expert_tensor(expert_tensor, expert_weights))
 
     return {
         alt: {"score": round(float(score), 4), "comment": interpret_score(score)}
         for alt, score in zip(alt_names, C)
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,99 @@
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+_IFS_BRACKETS = re.compile(r'[()"\']')
+_IFS_NUMBER = re.compile(r"[-+]?\d*\.\d+|\d+")
+
+
+def clean_string(s):
+    """Очистка строки от кавычек и лишних пробелов"""
+    return str(s).strip().strip('"\'') if pd.notna(s) else ""
+
+
+@lru_cache(maxsize=65536)
+def _parse_clean_ifs(s_clean: str, allow_empty: bool) -> Tuple[float, float, float]:
+    if not s_clean:
+        if allow_empty:
+            return 0.0, 0.0, 0.0
+        raise ValueError("Ошибка при разборе IFS '': пустое значение")
+
+    # Удаляем все скобки и кавычки
+    s_clean = _IFS_BRACKETS.sub("", s_clean)
+    numbers = [float(x) for x in _IFS_NUMBER.findall(s_clean)]
+    if len(numbers) != 3:
+        raise ValueError(
+            f"Ошибка при разборе IFS '{s_clean}': Ожидалось 3 числа, получено {len(numbers)}"
+        )
+    return numbers[0], numbers[1], numbers[2]
+
+
+def parse_ifs_string(s, allow_empty: bool = True) -> Tuple[float, float, float]:
+    """Разбор одной строки вида (μ, ν, π); результат кэшируется по очищенной строке"""
+    return _parse_clean_ifs(clean_string(s), allow_empty)
+
+
+def validate_ifs(values: np.ndarray) -> np.ndarray:
+    """
+    Проверка массива (..., 3): значения в [0, 1] и сумма ~1.0.
+    Возвращает маску некорректных троек.
+    """
+    in_range = np.all((values >= 0) & (values <= 1), axis=-1)
+    sums_ok = np.isclose(values.sum(axis=-1), 1.0, atol=0.01)
+    return ~(in_range & sums_ok)
+
+
+def ifs_error_reason(triple: np.ndarray) -> str:
+    if not np.all((triple >= 0) & (triple <= 1)):
+        return "Значения должны быть в диапазоне [0, 1]"
+    return f"Сумма значений должна быть ~1.0 (получено {triple.sum()})"
+
+
+def parse_ifs_value(s, validate: bool = True) -> np.ndarray:
+    """Разбор и проверка одной IFS-оценки; пустая ячейка дает нулевую тройку"""
+    s_clean = clean_string(s)
+    triple = np.array(_parse_clean_ifs(s_clean, True))
+    if validate and s_clean and validate_ifs(triple):
+        raise ValueError(
+            f"Ошибка при разборе IFS '{_IFS_BRACKETS.sub('', s_clean)}': {ifs_error_reason(triple)}"
+        )
+    return triple
+
+
+def parse_ifs_frame(df: pd.DataFrame, columns: List[str], validate: bool = True,
+                    allow_empty: bool = True) -> np.ndarray:
+    """
+    Разбор IFS-оценок всего DataFrame в массив (строки, столбцы, 3).
+    Каждая уникальная строка разбирается один раз, проверка диапазона
+    и суммы выполняется сразу по всем уникальным значениям.
+    """
+    values = df[columns].to_numpy().ravel()
+    value_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+
+    def locate(unique_index):
+        row, col = divmod(int(np.flatnonzero(value_codes == unique_index)[0]), len(columns))
+        return f"в столбце '{columns[col]}' (строка {row + 1})"
+
+    parsed = np.empty((len(uniques), 3))
+    for k, raw in enumerate(uniques):
+        try:
+            parsed[k] = parse_ifs_string(raw, allow_empty)
+        except ValueError as e:
+            raise ValueError(f"{e} {locate(k)}")
+
+    if validate:
+        invalid = validate_ifs(parsed)
+        # Пустые ячейки (нулевая тройка) допустимы так же, как при разборе по ячейкам
+        if allow_empty:
+            invalid &= np.array([clean_string(u) != "" for u in uniques], dtype=bool)
+        if invalid.any():
+            k = int(np.flatnonzero(invalid)[0])
+            s_clean = _IFS_BRACKETS.sub("", clean_string(uniques[k]))
+            raise ValueError(
+                f"Ошибка при разборе IFS '{s_clean}': {ifs_error_reason(parsed[k])} {locate(k)}"
+            )
+
+    return parsed[value_codes].reshape(len(df), len(columns), 3)
@@ -1,56 +1,148 @@
 import pandas as pd
-from collections import defaultdict
+import numpy as np
+
+from prioritization_tool.logic.ifs_parsing import parse_ifs_string, parse_ifs_frame
+from prioritization_tool.logic.row_registry import RowAccumulator
 
 
 def parse_ifs(value):
     try:
-        value = value.strip().replace("(", "").replace(")", "")
-        parts = value.split(",")
-        if len(parts) != 3:
-            raise ValueError(f"Ожидается 3 значения, получено {len(parts)}: {value}")
-        mu, nu, pi = map(float, parts)
-        return mu, nu, pi
-    except Exception as e:
+        return parse_ifs_string(value, allow_empty=False)
+    except ValueError as e:
         raise ValueError(f"Неверный формат IFS-числа: {value} — {str(e)}")
 
 
-def process_intuitionistic_delphi_csv(filepath):
-    df = pd.read_csv(filepath)
-    required_cols = {"Альтернатива", "Эксперт", "Вес эксперта"}
-    if not required_cols.issubset(df.columns):
-        raise ValueError("CSV должен содержать колонки: Альтернатива, Эксперт, критерии, Вес эксперта")
+REQUIRED_COLS = {"Альтернатива", "Эксперт", "Вес эксперта"}
+
+
+class IFSDelphiAccumulator(RowAccumulator):
+    """
+    Компактный агрегат Intuitionistic Delphi по (альтернатива, критерий):
+    взвешенные суммы μ и ν, сумма весов и минимум/максимум π.
+    Накапливается порциями CSV, сериализуется в словарь массивов и
+    объединяется с агрегатами других частей выгрузки с тем же результатом,
+    что и при обработке одного файла.
+    """
+
+    def __init__(self, criteria=None):
+        super().__init__()
+        self.criteria = list(criteria) if criteria is not None else None
+        self._declare_arrays(len(self.criteria) if self.criteria is not None else 0)
+
+    @property
+    def mu_sum(self):
+        return self._registry["mu_sum"]
+
+    @property
+    def nu_sum(self):
+        return self._registry["nu_sum"]
+
+    @property
+    def weight_sum(self):
+        return self._registry["weight_sum"]
+
+    @property
+    def pi_min(self):
+        return self._registry["pi_min"]
+
+    @property
+    def pi_max(self):
+        return self._registry["pi_max"]
+
+    def update(self, df):
+        """Добавление порции строк исходного CSV"""
+        if not REQUIRED_COLS.issubset(df.columns):
+            raise ValueError("CSV должен содержать колонки: Альтернатива, Эксперт, критерии, Вес эксперта")
+
+        criteria = [col for col in df.columns if col not in REQUIRED_COLS]
+        self._check_criteria(criteria)
+
+        alt_codes, alt_names = pd.factorize(df["Альтернатива"])
+        rows = self._alternative_rows(alt_names)[alt_codes]
+        weights = df["Вес эксперта"].astype(float).to_numpy()
+
+        values = parse_ifs_frame(df, self.criteria, validate=False, allow_empty=False)
+
+        n_alts = len(self._registry)
+        self.weight_sum[:] += np.bincount(rows, weights=weights, minlength=n_alts)
+        for j in range(len(self.criteria)):
+            mu, nu, pi = values[:, j, 0], values[:, j, 1], values[:, j, 2]
+            self.mu_sum[:, j] += np.bincount(rows, weights=mu * weights, minlength=n_alts)
+            self.nu_sum[:, j] += np.bincount(rows, weights=nu * weights, minlength=n_alts)
+            np.minimum.at(self.pi_min[:, j], rows, pi)
+            np.maximum.at(self.pi_max[:, j], rows, pi)
+        return self
+
+    def merge(self, other):
+        """Объединение с агрегатом другой части выгрузки (на месте)"""
+        if other.criteria is None:
+            return self
+        self._check_criteria(other.criteria)
+
+        rows = self._alternative_rows(other.alternatives)
+        np.add.at(self.mu_sum, rows, other.mu_sum)
+        np.add.at(self.nu_sum, rows, other.nu_sum)
+        np.add.at(self.weight_sum, rows, other.weight_sum)
+        np.minimum.at(self.pi_min, rows, other.pi_min)
+        np.maximum.at(self.pi_max, rows, other.pi_max)
+        return self
+
+    def to_arrays(self):
+        """Сериализуемое представление (например, для np.savez)"""
+        arrays = self._registry.to_arrays()
+        arrays["criteria"] = np.array(self.criteria or [], dtype=str)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Восстановление агрегата из to_arrays()"""
+        accumulator = cls(arrays["criteria"].tolist())
+        accumulator._registry.restore(arrays)
+        return accumulator
 
-    criteria = [col for col in df.columns if col not in {"Альтернатива", "Эксперт", "Вес эксперта"}]
-    results = defaultdict(lambda: defaultdict(list))
+    def results(self):
+        """Итоговые оценки в формате process_intuitionistic_delphi_csv"""
+        weight_sum = self.weight_sum[:, np.newaxis]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mu_avg = np.where(weight_sum != 0, self.mu_sum / weight_sum, 0)
+            nu_avg = np.where(weight_sum != 0, self.nu_sum / weight_sum, 0)
+        pi_range = self.pi_max - self.pi_min
 
-    for _, row in df.iterrows():
-        alt = row["Альтернатива"]
-        weight = float(row["Вес эксперта"])
+        final_results = {}
+        for i, alt in enumerate(self.alternatives):
+            aggregated = {}
+            for j, crit in enumerate(self.criteria):
+                aggregated[crit] = {
+                    "mu": round(float(mu_avg[i, j]), 3),
+                    "nu": round(float(nu_avg[i, j]), 3),
+                    "pi_range": round(float(pi_range[i, j]), 3),
+                    "confidence": round(float(1 - pi_range[i, j]), 3)
+                }
+            final_results[alt] = aggregated
+        return final_results
 
-        for crit in criteria:
-            mu, nu, pi = parse_ifs(str(row[crit]))
-            results[alt][crit].append(((mu, nu, pi), weight))
+    def _check_criteria(self, criteria):
+        if self.criteria is None:
+            self.criteria = list(criteria)
+            self._declare_arrays(len(self.criteria))
+        elif list(criteria) != self.criteria:
+            raise ValueError(f"Набор критериев не совпадает: {list(criteria)} вместо {self.criteria}")
 
-    final_results = {}
-    for alt, crit_dict in results.items():
-        aggregated = {}
-        for crit, values in crit_dict.items():
-            mu_sum = sum(mu * w for (mu, _, _), w in values)
-            nu_sum = sum(nu * w for (_, nu, _), w in values)
-            pi_vals = [pi for (_, _, pi), _ in values]
+    def _declare_arrays(self, n_crit):
+        self._registry.add_array("mu_sum", (n_crit,))
+        self._registry.add_array("nu_sum", (n_crit,))
+        self._registry.add_array("weight_sum")
+        self._registry.add_array("pi_min", (n_crit,), fill=np.inf)
+        self._registry.add_array("pi_max", (n_crit,), fill=-np.inf)
 
-            weight_sum = sum(w for _, w in values)
-            mu_avg = mu_sum / weight_sum if weight_sum else 0
-            nu_avg = nu_sum / weight_sum if weight_sum else 0
-            pi_range = max(pi_vals) - min(pi_vals) if pi_vals else 0
 
-            aggregated[crit] = {
-                "mu": round(mu_avg, 3),
-                "nu": round(nu_avg, 3),
-                "pi_range": round(pi_range, 3),
-                "confidence": round(1 - pi_range, 3)
-            }
+def accumulate_intuitionistic_delphi_csv(filepath, chunksize=100_000):
+    """Потоковое накопление агрегата по CSV порциями по chunksize строк"""
+    accumulator = IFSDelphiAccumulator()
+    for chunk in pd.read_csv(filepath, chunksize=chunksize):
+        accumulator.update(chunk)
+    return accumulator
 
-        final_results[alt] = aggregated
 
-    return final_results
+def process_intuitionistic_delphi_csv(filepath, chunksize=100_000):
+    return accumulate_intuitionistic_delphi_csv(filepath, chunksize).results()
@@ -2,6 +2,11 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Tuple, Union
 
+from prioritization_tool.logic.linguistic_codes import (
+    compile_scale, scale_to_arrays, scale_from_arrays, load_label_matrix
+)
+from prioritization_tool.logic.parse_cache import cached_parse
+
 def parse_ifs_scale(scale_path: str) -> Dict[str, Tuple[float, float, float]]:
     df = pd.read_csv(scale_path)
     scale_dict = {}
@@ -13,49 +18,123 @@ def parse_ifs_scale(scale_path: str) -> Dict[str, Tuple[float, float, float]]:
         scale_dict[label] = (mu, nu, pi)
     return scale_dict
 
+def compile_ifs_scale(scale_path: str) -> Tuple[np.ndarray, Dict[str, int]]:
+    """Шкала в виде плотной таблицы (метки, 3) с (μ, ν, π) и отображения метка → код"""
+    entry = cached_parse(
+        "intuitionistic_topsis.scale", scale_path,
+        lambda path: scale_to_arrays(*compile_scale(parse_ifs_scale(path)))
+    )
+    return scale_from_arrays(entry)
+
+def ifs_closeness_components(mu: np.ndarray, nu: np.ndarray, pi: np.ndarray,
+                             criteria_first: bool = False) -> np.ndarray:
+    """
+    Коэффициенты близости IFS TOPSIS по компонентам μ, ν, π формы (..., альтернативы, критерии)
+    или (..., критерии, альтернативы) при criteria_first=True. Ведущие оси (например,
+    выборки Монте-Карло) обрабатываются независимо.
+    """
+    alt_axis, crit_axis = (-1, -2) if criteria_first else (-2, -1)
+
+    mu_plus = np.max(mu, axis=alt_axis, keepdims=True)
+    nu_minus = np.min(nu, axis=alt_axis, keepdims=True)
+    pi_minus = np.min(pi, axis=alt_axis, keepdims=True)
+
+    mu_minus = np.min(mu, axis=alt_axis, keepdims=True)
+    nu_plus = np.max(nu, axis=alt_axis, keepdims=True)
+    pi_plus = np.max(pi, axis=alt_axis, keepdims=True)
+
+    D_plus = np.sqrt(np.sum((mu - mu_plus)**2 + (nu - nu_minus)**2 + (pi - pi_minus)**2, axis=crit_axis))
+    D_minus = np.sqrt(np.sum((mu - mu_minus)**2 + (nu - nu_plus)**2 + (pi - pi_plus)**2, axis=crit_axis))
+
+    return D_minus / (D_plus + D_minus)
+
+def ifs_closeness(matrix: np.ndarray) -> np.ndarray:
+    """Коэффициенты близости IFS TOPSIS для массива (..., альтернативы, критерии, 3)"""
+    return ifs_closeness_components(matrix[..., 0], matrix[..., 1], matrix[..., 2])
+
+def interpret_score(c: float) -> str:
+    if c >= 0.7:
+        return "Высокий приоритет"
+    elif c >= 0.4:
+        return "Средний приоритет"
+    else:
+        return "Низкий приоритет"
+
 def calculate_ifs_topsis(input_path: str, scale_path: str) -> Dict[str, Dict[str, Union[float, str]]]:
-    df = pd.read_csv(input_path)
-    scale = parse_ifs_scale(scale_path)
+    table, label_to_code = compile_ifs_scale(scale_path)
+    alt_names, codes = load_label_matrix(input_path, label_to_code)
 
-    matrix = []
-    alt_names = []
-    for _, row in df.iterrows():
-        alt_names.append(row["Альтернатива"])
-        row_vals = []
-        for col in df.columns[1:]:
-            val = str(row[col]).strip()
-            if val not in scale:
-                raise ValueError(f"Недопустимое значение '{val}' в столбце '{col}'")
-            row_vals.append(scale[val])
-        matrix.append(row_vals)
-
-    matrix = np.array(matrix)
-    mu = matrix[:, :, 0]
-    nu = matrix[:, :, 1]
-    pi = matrix[:, :, 2]
-
-    mu_plus = np.max(mu, axis=0)
-    nu_minus = np.min(nu, axis=0)
-    pi_minus = np.min(pi, axis=0)
-
-    mu_minus = np.min(mu, axis=0)
-    nu_plus = np.max(nu, axis=0)
-    pi_plus = np.max(pi, axis=0)
-
-    D_plus = np.sqrt(np.sum((mu - mu_plus)**2 + (nu - nu_minus)**2 + (pi - pi_minus)**2, axis=1))
-    D_minus = np.sqrt(np.sum((mu - mu_minus)**2 + (nu - nu_plus)**2 + (pi - pi_plus)**2, axis=1))
-
-    C = D_minus / (D_plus + D_minus)
-
-    def interpret(c):
-        if c >= 0.7:
-            return "Высокий приоритет"
-        elif c >= 0.4:
-            return "Средний приоритет"
-        else:
-            return "Низкий приоритет"
+    C = ifs_closeness(table[codes])
 
     return {
-        alt: {"score": round(float(ci), 4), "comment": interpret(ci)}
+        alt: {"score": round(float(ci), 4), "comment": interpret_score(ci)}
         for alt, ci in zip(alt_names, C)
-    }
\ No newline at end of file
+    }
+
+def sample_ifs_perturbations(matrix: np.ndarray, n_samples: int,
+                             rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Выборки возмущенных (μ, ν, π) в пределах степени неопределенности:
+    π равномерно (по симплексу) делится между приростом μ, приростом ν и остатком π.
+    matrix: (..., 3); возвращает компоненты μ, ν, π формы (n_samples, ...).
+    """
+    u = rng.random((n_samples,) + matrix.shape[:-1])
+    v = rng.random((n_samples,) + matrix.shape[:-1])
+    low = np.minimum(u, v)
+    high = np.maximum(u, v)
+
+    pi = matrix[..., 2]
+    mu_sample = matrix[..., 0] + pi * low
+    nu_sample = matrix[..., 1] + pi * (high - low)
+    pi_sample = pi * (1 - high)
+    return mu_sample, nu_sample, pi_sample
+
+def ifs_topsis_robustness(input_path: str, scale_path: str, n_samples: int = 1000,
+                          top_k: int = 3, percentiles: Tuple[float, ...] = (5, 50, 95),
+                          max_chunk_elements: int = 20_000_000,
+                          seed: Union[int, None] = None) -> Dict[str, Dict[str, object]]:
+    """
+    Анализ устойчивости IFS TOPSIS методом Монте-Карло.
+    Выборки оцениваются пакетами так, чтобы каждый промежуточный массив
+    содержал не более max_chunk_elements чисел. Для каждой альтернативы возвращаются
+    точечная оценка, средняя оценка по выборкам, перцентили и вероятность
+    попадания в top-k.
+    """
+    table, label_to_code = compile_ifs_scale(scale_path)
+    alt_names, codes = load_label_matrix(input_path, label_to_code)
+    matrix = table[codes]
+    # Выборки строятся в раскладке (критерии, альтернативы): экстремумы по
+    # альтернативам тогда берутся вдоль непрерывной оси
+    matrix_by_criteria = np.ascontiguousarray(matrix.transpose(1, 0, 2))
+
+    n_alts = matrix.shape[0]
+    top_k = min(top_k, n_alts)
+    chunk_size = max(1, min(n_samples, max_chunk_elements // max(codes.size, 1)))
+    rng = np.random.default_rng(seed)
+
+    scores = np.empty((n_samples, n_alts))
+    top_counts = np.zeros(n_alts, dtype=np.int64)
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        samples = sample_ifs_perturbations(matrix_by_criteria, stop - start, rng)
+        chunk_scores = ifs_closeness_components(*samples, criteria_first=True)
+        scores[start:stop] = chunk_scores
+
+        top = np.argpartition(-chunk_scores, top_k - 1, axis=1)[:, :top_k]
+        top_counts += np.bincount(top.ravel(), minlength=n_alts)
+
+    point = ifs_closeness(matrix)
+    mean = scores.mean(axis=0)
+    bands = np.percentile(scores, percentiles, axis=0)
+    top_probability = top_counts / n_samples
+
+    return {
+        alt: {
+            "score": round(float(point[i]), 4),
+            "mean": round(float(mean[i]), 4),
+            "percentiles": {p: round(float(bands[j, i]), 4) for j, p in enumerate(percentiles)},
+            "top_k_probability": round(float(top_probability[i]), 4),
+            "comment": interpret_score(mean[i])
+        }
+        for i, alt in enumerate(alt_names)
+    }
@@ -0,0 +1,85 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Tuple
+
+from prioritization_tool.logic.parse_cache import cached_parse
+
+
+def compile_scale(scale_dict: Dict[str, tuple]) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Компилирует словарь шкалы в плотную таблицу значений и отображение метка → код.
+    Строка table[code] содержит числовое представление метки.
+    """
+    labels = list(scale_dict.keys())
+    table = np.array([np.asarray(scale_dict[label], dtype=float) for label in labels])
+    return table, {label: code for code, label in enumerate(labels)}
+
+
+def scale_to_arrays(table: np.ndarray, label_to_code: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """Представление скомпилированной шкалы для кэша разбора"""
+    return {"table": table, "labels": np.array(list(label_to_code), dtype=str)}
+
+
+def scale_from_arrays(entry: Dict[str, np.ndarray]) -> Tuple[np.ndarray, Dict[str, int]]:
+    """Обратное преобразование записи кэша в таблицу и отображение метка → код"""
+    return entry["table"], {label: code for code, label in enumerate(entry["labels"].tolist())}
+
+
+def factorize_labels(df: pd.DataFrame, columns: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Категориальное кодирование столбцов: уникальные очищенные значения
+    и индексы в них формы (строки, столбцы).
+    """
+    values = df[columns].to_numpy().ravel()
+    value_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    uniques = np.array([str(u).strip() for u in uniques], dtype=str)
+    return uniques, value_codes.reshape(len(df), len(columns))
+
+
+def map_label_codes(uniques: np.ndarray, value_codes: np.ndarray, columns: List[str],
+                    label_to_code: Dict[str, int]) -> np.ndarray:
+    """Перевод категориальных индексов в коды шкалы с проверкой неизвестных меток"""
+    unique_codes = np.array([label_to_code.get(u, -1) for u in uniques.tolist()], dtype=np.int64)
+    codes = unique_codes[value_codes]
+
+    unknown = np.flatnonzero(codes.ravel() < 0)
+    if unknown.size:
+        row, col = divmod(int(unknown[0]), len(columns))
+        key = uniques[value_codes[row, col]]
+        raise ValueError(
+            f"Недопустимое значение '{key}' в столбце '{columns[col]}' (строка {row + 1})"
+        )
+
+    return codes
+
+
+def encode_labels(df: pd.DataFrame, columns: List[str], label_to_code: Dict[str, int]) -> np.ndarray:
+    """
+    Переводит лингвистические оценки в целочисленные коды формы (строки, столбцы).
+    Каждое уникальное значение очищается и ищется в шкале один раз.
+    """
+    uniques, value_codes = factorize_labels(df, columns)
+    return map_label_codes(uniques, value_codes, columns, label_to_code)
+
+
+def _load_label_matrix(input_path: str) -> Dict[str, np.ndarray]:
+    df = pd.read_csv(input_path)
+    columns = list(df.columns[1:])
+    uniques, value_codes = factorize_labels(df, columns)
+    return {
+        "alternatives": df["Альтернатива"].astype(str).to_numpy(dtype=str),
+        "columns": np.array(columns, dtype=str),
+        "uniques": uniques,
+        "value_codes": value_codes,
+    }
+
+
+def load_label_matrix(input_path: str, label_to_code: Dict[str, int]) -> Tuple[List[str], np.ndarray]:
+    """
+    Чтение матрицы лингвистических оценок (Альтернатива + критерии) через кэш разбора.
+    Возвращает имена альтернатив и коды шкалы формы (альтернативы, критерии).
+    """
+    entry = cached_parse("linguistic_matrix", input_path, _load_label_matrix)
+    codes = map_label_codes(entry["uniques"], entry["value_codes"],
+                            entry["columns"].tolist(), label_to_code)
+    return entry["alternatives"].tolist(), codes
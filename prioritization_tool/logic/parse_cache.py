@@ -0,0 +1,177 @@
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+ArrayDict = Dict[str, np.ndarray]
+
+
+class ParseCache:
+    """
+    Кэш результатов разбора CSV-файлов (шкал и входных матриц).
+
+    Ключ записи — вид разбора + версия загрузчика + путь + размер + время
+    изменения файла (или SHA-1 содержимого при hash_content=True), поэтому
+    изменение файла автоматически делает запись недействительной. При
+    изменении формата результата загрузчика его версия увеличивается —
+    записи старого формата (в том числе на диске) больше не используются.
+    Значение — словарь NumPy-массивов. В памяти хранится не более
+    max_entries записей (LRU), при заданном disk_dir записи дублируются на
+    диск в .npz, и холодный старт приложения обходится без повторного
+    разбора CSV.
+
+    Дисковый уровень ограничен: для каждого источника (вид, версия, путь)
+    хранится только последняя запись — устаревшие удаляются при записи
+    новой, а суммарный размер каталога не превышает max_disk_bytes
+    (вытесняются давно не использованные файлы).
+    """
+
+    def __init__(self, max_entries: int = 64, disk_dir: Optional[str] = None,
+                 hash_content: bool = False, max_disk_bytes: int = 256 * 2 ** 20):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.hash_content = hash_content
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, ArrayDict]" = OrderedDict()
+
+    def configure(self, max_entries: Optional[int] = None, disk_dir: Optional[str] = None,
+                  hash_content: Optional[bool] = None, max_disk_bytes: Optional[int] = None):
+        """Изменение параметров кэша (например, включение дискового уровня)"""
+        if max_entries is not None:
+            self.max_entries = max_entries
+        if disk_dir is not None:
+            self.disk_dir = disk_dir
+        if hash_content is not None:
+            self.hash_content = hash_content
+        if max_disk_bytes is not None:
+            self.max_disk_bytes = max_disk_bytes
+        self._evict()
+        self._evict_disk()
+
+    def clear(self):
+        """Очистка кэша в памяти (файлы на диске не удаляются)"""
+        self._entries.clear()
+
+    def get(self, kind: str, path: str, loader: Callable[[str], ArrayDict],
+            version: int = 1) -> ArrayDict:
+        """Возвращает результат loader(path) из кэша или выполняет разбор и сохраняет его"""
+        source = self._source_key(kind, path, version)
+        key = f"{source}|{self._file_stamp(path)}"
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        entry = self._load_from_disk(source, key)
+        if entry is None:
+            entry = {name: np.asarray(value) for name, value in loader(path).items()}
+            self._save_to_disk(source, key, entry)
+
+        for value in entry.values():
+            value.flags.writeable = False
+        self._entries[key] = entry
+        self._evict()
+        return entry
+
+    @staticmethod
+    def _source_key(kind: str, path: str, version: int = 1) -> str:
+        return f"{kind}|v{version}|{os.path.abspath(path)}"
+
+    def _file_stamp(self, path: str) -> str:
+        if self.hash_content:
+            digest = hashlib.sha1()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            return digest.hexdigest()
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, source: str, key: str) -> Optional[str]:
+        # Имя файла: <хэш источника>-<хэш ключа>, по префиксу находятся устаревшие записи источника
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, f"{self._digest(source)}-{self._digest(key)}.npz")
+
+    def _load_from_disk(self, source: str, key: str) -> Optional[ArrayDict]:
+        disk_path = self._disk_path(source, key)
+        if not disk_path or not os.path.exists(disk_path):
+            return None
+        try:
+            with np.load(disk_path, allow_pickle=False) as data:
+                entry = {name: data[name] for name in data.files}
+            # Время доступа для вытеснения давно не использованных файлов
+            os.utime(disk_path)
+            return entry
+        except (OSError, ValueError):
+            # Поврежденный файл кэша просто разбираем заново
+            return None
+
+    def _save_to_disk(self, source: str, key: str, entry: ArrayDict):
+        disk_path = self._disk_path(source, key)
+        if not disk_path or any(value.dtype == object for value in entry.values()):
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".npz.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **entry)
+            os.replace(tmp_path, disk_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        prefix = f"{self._digest(source)}-"
+        for name in os.listdir(self.disk_dir):
+            if name.startswith(prefix) and name.endswith(".npz") and name != os.path.basename(disk_path):
+                self._remove(os.path.join(self.disk_dir, name))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".npz"):
+                try:
+                    stat = os.stat(os.path.join(self.disk_dir, name))
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(os.path.join(self.disk_dir, name))
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# Общий кэш модулей разбора; дисковый уровень включается через PARSE_CACHE.configure(disk_dir=...)
+PARSE_CACHE = ParseCache()
+
+
+def cached_parse(kind: str, path: str, loader: Callable[[str], ArrayDict],
+                 version: int = 1) -> ArrayDict:
+    """Разбор файла через общий кэш; version увеличивается при изменении формата loader"""
+    return PARSE_CACHE.get(kind, path, loader, version)
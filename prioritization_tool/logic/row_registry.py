@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class RowRegistry:
+    """
+    Реестр строк потокового агрегата: имя альтернативы → номер строки и
+    массивы, первая ось которых — строки реестра.
+
+    Массивы хранятся с запасом емкости, которая растет удвоением, поэтому
+    поступление новых имен порциями стоит амортизированно O(1) на строку,
+    а не копирования всех массивов на каждой порции. registry[name] —
+    представление занятых строк, изменения на месте попадают в агрегат.
+    """
+
+    def __init__(self):
+        self._index = {}
+        self._buffers = {}
+        self._fills = {}
+        self._capacity = 0
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def names(self):
+        return list(self._index)
+
+    def add_array(self, name, row_shape=(), fill=0.0, dtype=float):
+        """Объявление массива формы (строки,) + row_shape; новые строки заполняются fill"""
+        self._buffers[name] = np.full((self._capacity,) + tuple(row_shape), fill, dtype=dtype)
+        self._fills[name] = fill
+
+    def __getitem__(self, name):
+        return self._buffers[name][:len(self._index)]
+
+    def __setitem__(self, name, values):
+        self._buffers[name][:len(self._index)] = values
+
+    def rows(self, names):
+        """Номера строк имен; новые имена добавляются в конец в порядке первого появления"""
+        for name in dict.fromkeys(names):
+            if name not in self._index:
+                self._index[name] = len(self._index)
+        self._reserve(len(self._index))
+        return np.array([self._index[name] for name in names], dtype=np.int64)
+
+    def to_arrays(self):
+        """Имена ('alternatives') и занятые строки всех массивов"""
+        arrays = {"alternatives": np.array([str(name) for name in self._index], dtype=str)}
+        arrays.update({name: self[name] for name in self._buffers})
+        return arrays
+
+    def restore(self, arrays):
+        """Заполнение пустого реестра из to_arrays() (массивы должны быть объявлены)"""
+        if self._index:
+            raise ValueError("Восстановление возможно только в пустой реестр")
+        self.rows(arrays["alternatives"].tolist())
+        for name in self._buffers:
+            self[name] = arrays[name]
+
+    def _reserve(self, n):
+        if n <= self._capacity:
+            return
+        self._capacity = max(n, 2 * self._capacity, 16)
+        for name, buffer in self._buffers.items():
+            grown = np.full((self._capacity,) + buffer.shape[1:], self._fills[name], dtype=buffer.dtype)
+            grown[:len(buffer)] = buffer
+            self._buffers[name] = grown
+
+
+class RowAccumulator:
+    """
+    Основа потоковых агрегатов по альтернативам: реестр строк self._registry
+    и сохранение в .npz. Подкласс объявляет массивы реестра и реализует
+    to_arrays() / from_arrays().
+    """
+
+    def __init__(self):
+        self._registry = RowRegistry()
+
+    @property
+    def alternatives(self):
+        return self._registry.names
+
+    def save(self, path):
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays({name: data[name] for name in data.files})
+
+    def _alternative_rows(self, names):
+        return self._registry.rows(names)
@@ -0,0 +1,195 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Tuple
+
+from prioritization_tool.logic.fuzzy_ahp import (
+    encode_type2_labels, type2_scale_arrays, defuzzify_type2
+)
+
+# Длинный формат: одна строка — одно суждение "Критерий A > Критерий B"
+EDGE_COLS = ["Критерий A", "Критерий B", "Оценка"]
+
+
+def _aggregate_edges(a_names: np.ndarray, b_names: np.ndarray, codes: np.ndarray,
+                     weights: np.ndarray, all_criteria: List[str] = ()
+                     ) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Взвешенная агрегация суждений по упорядоченным парам (A, B) и дефаззификация.
+    Возвращает критерии, индексы концов ребер и четкие отношения A/B;
+    критерии из all_criteria без суждений остаются в списке изолированными.
+    """
+    names = np.concatenate([a_names, b_names, np.array(list(all_criteria), dtype=object)])
+    crit_codes, criteria = pd.factorize(names, sort=True)
+    head, tail = crit_codes[:len(a_names)], crit_codes[len(a_names):2 * len(a_names)]
+    if np.any(head == tail):
+        k = int(np.flatnonzero(head == tail)[0])
+        raise ValueError(f"Критерий сравнивается сам с собой: '{a_names[k]}' (суждение {k + 1})")
+
+    n = len(criteria)
+    edge_codes, edge_keys = pd.factorize(head.astype(np.int64) * n + tail)
+    n_edges = len(edge_keys)
+
+    lower_scale, upper_scale = type2_scale_arrays()
+    weight_sum = np.bincount(edge_codes, weights=weights, minlength=n_edges)
+    lower = np.stack([np.bincount(edge_codes, weights=lower_scale[codes, k] * weights, minlength=n_edges)
+                      for k in range(4)], axis=-1)
+    upper = np.stack([np.bincount(edge_codes, weights=upper_scale[codes, k] * weights, minlength=n_edges)
+                      for k in range(4)], axis=-1)
+    if np.any(weight_sum <= 0):
+        raise ValueError("Сумма весов суждений по паре критериев должна быть положительной")
+
+    crisp = defuzzify_type2(lower / weight_sum[:, np.newaxis], upper / weight_sum[:, np.newaxis])
+    return [str(c) for c in criteria], edge_keys // n, edge_keys % n, crisp
+
+
+def load_sparse_comparisons(filepath: str) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Чтение неполного набора парных сравнений Type-2.
+
+    Поддерживаются два формата:
+    - широкий (как в process_fuzzy_ahp_type2): Эксперт, Вес и столбцы "A > B",
+      пустая ячейка означает, что эксперт пару не оценивал;
+    - длинный: Критерий A, Критерий B, Оценка и необязательный Вес.
+    """
+    df = pd.read_csv(filepath, quotechar='"')
+
+    if set(EDGE_COLS).issubset(df.columns):
+        codes = encode_type2_labels(df[["Оценка"]].to_numpy(), ["Оценка"]).ravel()
+        weights = df["Вес"].astype(float).to_numpy() if "Вес" in df.columns else np.ones(len(df))
+        a_names = df["Критерий A"].astype(str).str.strip().to_numpy()
+        b_names = df["Критерий B"].astype(str).str.strip().to_numpy()
+        return _aggregate_edges(a_names, b_names, codes, weights)
+
+    required_cols = {"Эксперт", "Вес"}
+    if not required_cols.issubset(df.columns):
+        raise ValueError(
+            f"CSV должен содержать колонки {EDGE_COLS} или Эксперт, Вес и столбцы вида 'A > B'"
+        )
+
+    comparison_cols = [col for col in df.columns if col not in ["Эксперт", "Вес"]]
+    pairs = [col.split(" > ") for col in comparison_cols]
+    bad = [col for col, pair in zip(comparison_cols, pairs) if len(pair) != 2]
+    if bad:
+        raise ValueError(f"Столбец сравнения должен иметь вид 'A > B': {bad[0]}")
+
+    codes = encode_type2_labels(df[comparison_cols].to_numpy(), comparison_cols, allow_empty=True)
+    rows, cols = np.nonzero(codes >= 0)
+    a_names = np.array([pair[0].strip() for pair in pairs], dtype=object)[cols]
+    b_names = np.array([pair[1].strip() for pair in pairs], dtype=object)[cols]
+    weights = df["Вес"].astype(float).to_numpy()[rows]
+    all_criteria = {name.strip() for pair in pairs for name in pair}
+    return _aggregate_edges(a_names, b_names, codes[rows, cols], weights, sorted(all_criteria))
+
+
+def connected_components(n: int, head: np.ndarray, tail: np.ndarray) -> np.ndarray:
+    """
+    Метки компонент связности графа сравнений (минимальный индекс вершины компоненты).
+    Подвешивание к меньшей метке и сжатие путей выполняются над всеми ребрами сразу.
+    """
+    labels = np.arange(n)
+    while True:
+        lh, lt = labels[head], labels[tail]
+        low = np.minimum(lh, lt)
+        previous = labels.copy()
+        np.minimum.at(labels, lh, low)
+        np.minimum.at(labels, lt, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def laplacian_lls(n: int, head: np.ndarray, tail: np.ndarray, log_ratios: np.ndarray,
+                  tol: float = 1e-10, max_iter: int = None) -> np.ndarray:
+    """
+    Логарифмический метод наименьших квадратов: min Σ (x_a − x_b − ln r_ab)².
+    Нормальные уравнения L x = b с лапласианом графа сравнений решаются методом
+    сопряженных градиентов с предобуславливателем Якоби без построения матрицы:
+    умножение на L — две свертки bincount по ребрам, O(n + m) на итерацию.
+    Решение центрировано в каждой компоненте связности.
+    """
+    degree = np.bincount(head, minlength=n) + np.bincount(tail, minlength=n)
+    rhs = np.bincount(head, weights=log_ratios, minlength=n) - np.bincount(tail, weights=log_ratios, minlength=n)
+    inv_degree = np.divide(1.0, degree, out=np.zeros(n), where=degree > 0)
+
+    def laplacian(x):
+        diff = x[head] - x[tail]
+        return np.bincount(head, weights=diff, minlength=n) - np.bincount(tail, weights=diff, minlength=n)
+
+    x = np.zeros(n)
+    residual = rhs.copy()
+    z = inv_degree * residual
+    direction = z.copy()
+    rz = residual @ z
+    threshold = tol * max(np.linalg.norm(rhs), 1.0)
+    for _ in range(max_iter or 10 * n + 100):
+        if np.linalg.norm(residual) <= threshold:
+            break
+        product = laplacian(direction)
+        step = rz / (direction @ product)
+        x += step * direction
+        residual -= step * product
+        z = inv_degree * residual
+        rz_next = residual @ z
+        direction = z + (rz_next / rz) * direction
+        rz = rz_next
+
+    labels = connected_components(n, head, tail)
+    component_mean = np.bincount(labels, weights=x, minlength=n) / np.maximum(np.bincount(labels, minlength=n), 1)
+    return x - component_mean[labels]
+
+
+def connectivity_report(criteria: List[str], head: np.ndarray, tail: np.ndarray,
+                        weights: np.ndarray) -> Dict[str, object]:
+    """
+    Отчет о пробелах в графе сравнений: компоненты связности, изолированные
+    критерии и сравнения, которые свяжут каждую компоненту с крупнейшей
+    (сравниваются критерии с наибольшим весом в своих компонентах).
+    """
+    n = len(criteria)
+    labels = connected_components(n, head, tail)
+    roots, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    order = np.argsort(-sizes, kind="stable")
+
+    # Представитель компоненты — критерий с наибольшим весом
+    best = np.lexsort((-weights, inverse))
+    representatives = best[np.r_[0, np.cumsum(sizes)[:-1]]]
+
+    members = np.split(np.argsort(inverse, kind="stable"), np.cumsum(sizes)[:-1])
+    degree = np.bincount(head, minlength=n) + np.bincount(tail, minlength=n)
+    main = order[0] if len(order) else None
+    return {
+        "components": len(roots),
+        "groups": [[criteria[i] for i in members[c]] for c in order],
+        "isolated": [criteria[i] for i in np.flatnonzero(degree == 0)],
+        "comparisons": int(len(head)),
+        "suggested_comparisons": [
+            (criteria[representatives[main]], criteria[representatives[c]]) for c in order[1:]
+        ],
+    }
+
+
+def process_sparse_fuzzy_ahp(filepath: str, tol: float = 1e-10) -> Dict[str, object]:
+    """
+    Fuzzy AHP по неполному набору парных сравнений Type-2.
+    Веса критериев — логарифмический МНК на графе сравнений; для связного
+    графа достаточно n − 1 сравнений. Если граф несвязен, веса разных
+    компонент несопоставимы: они нормализуются вместе, а в отчете
+    connectivity перечислены компоненты и недостающие сравнения.
+    """
+    criteria, head, tail, crisp = load_sparse_comparisons(filepath)
+    n = len(criteria)
+
+    log_weights = laplacian_lls(n, head, tail, np.log(crisp), tol=tol)
+    weights = np.exp(log_weights)
+    weights /= weights.sum()
+
+    residuals = log_weights[head] - log_weights[tail] - np.log(crisp)
+    return {
+        "weights": {crit: float(w) for crit, w in zip(criteria, weights)},
+        "log_residual_rms": float(np.sqrt(np.mean(residuals ** 2))) if len(residuals) else 0.0,
+        "connectivity": connectivity_report(criteria, head, tail, weights),
+    }
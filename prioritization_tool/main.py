@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from prioritization_tool.logic.MoSCoW import parser, moscow, moscow_report
 from prioritization_tool.logic.Kano import kano, kano_report
+from prioritization_tool.logic.parse_cache import PARSE_CACHE
 import os
 
 
@@ -26,6 +27,10 @@ class PrioritizationTool:
         self.ahp_type1_weights_path = None
         self.ahp_type2_path  = None
 
+        # Разобранные CSV сохраняются между запусками, чтобы не разбирать их повторно;
+        # на диске хранится последняя запись каждого файла, каталог ограничен по размеру
+        PARSE_CACHE.configure(disk_dir=os.path.join("output", "cache"))
+
         self.setup_style()
         self.show_method_selection_screen()
 
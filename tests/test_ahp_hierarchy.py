@@ -0,0 +1,46 @@
+import numpy as np
+
+from prioritization_tool.logic.ahp_hierarchy import AHPHierarchy
+
+
+def _consistent_matrix(weights):
+    weights = np.asarray(weights, dtype=float)
+    return weights[:, np.newaxis] / weights[np.newaxis, :]
+
+
+def _hierarchy():
+    hierarchy = AHPHierarchy("Цель")
+    for name in ["A", "B", "C"]:
+        hierarchy.add_node(name, "Цель")
+    return hierarchy
+
+
+def test_set_judgments_order_is_cyclic_permutation():
+    hierarchy = _hierarchy()
+    # Строки матрицы в порядке B, C, A — циклическая перестановка порядка добавления
+    hierarchy.set_judgments("Цель", _consistent_matrix([0.5, 0.3, 0.2]), order=["B", "C", "A"])
+
+    weights = hierarchy.local_weights("Цель")
+    assert np.allclose([weights["A"], weights["B"], weights["C"]], [0.2, 0.5, 0.3])
+
+
+def test_set_judgments_fuzzy_order_matches_insertion_order():
+    crisp = _consistent_matrix([0.5, 0.3, 0.2])
+    fuzzy = np.stack([crisp, crisp, crisp], axis=-1)
+
+    permuted = _hierarchy()
+    permuted.set_judgments("Цель", fuzzy, order=["B", "C", "A"])
+
+    inverse = np.argsort([1, 2, 0])
+    direct = _hierarchy()
+    direct.set_judgments("Цель", fuzzy[np.ix_(inverse, inverse)])
+
+    assert np.allclose(list(permuted.global_weights().values()), list(direct.global_weights().values()))
+
+
+def test_set_local_weights_order():
+    hierarchy = _hierarchy()
+    hierarchy.set_local_weights("Цель", {"B": 5.0, "C": 3.0, "A": 2.0})
+
+    weights = hierarchy.local_weights("Цель")
+    assert np.allclose([weights["A"], weights["B"], weights["C"]], [0.2, 0.5, 0.3])
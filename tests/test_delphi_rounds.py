@@ -0,0 +1,44 @@
+import pandas as pd
+
+from prioritization_tool.logic.delphi_rounds import DelphiRounds
+
+HIGH = "Высокая уверенность – Высокая"
+MEDIUM = "Средняя уверенность – Средняя"
+
+
+def _write_round(path, rows):
+    df = pd.DataFrame(rows, columns=["Альтернатива", "Эксперт", "Безопасность", "Удобство", "Вес эксперта"])
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_new_alternative_is_aggregated_after_criterion_closed(tmp_path):
+    base = [
+        ["Авторизация", "Эксперт 1", HIGH, MEDIUM, 0.6],
+        ["Авторизация", "Эксперт 2", HIGH, HIGH, 0.4],
+    ]
+    rounds = DelphiRounds(kind="it2fs")
+    rounds.ingest_round(_write_round(tmp_path / "round1.csv", base))
+    rounds.ingest_round(_write_round(tmp_path / "round2.csv", base))
+    assert rounds.consensus_criteria() == ["Безопасность", "Удобство"]
+
+    # Новая альтернатива появляется после закрытия обоих критериев
+    report = rounds.ingest_round(_write_round(tmp_path / "round3.csv", base + [
+        ["Журнал аудита", "Эксперт 1", MEDIUM, HIGH, 0.6],
+        ["Журнал аудита", "Эксперт 2", MEDIUM, HIGH, 0.4],
+    ]))
+    assert list(report) == ["Журнал аудита"]
+    assert set(report["Журнал аудита"]) == {"Безопасность", "Удобство"}
+    assert rounds.results()["Журнал аудита"]["Безопасность"]["rounds"] == 1
+
+
+def test_closed_round_is_skipped(tmp_path):
+    base = [
+        ["Авторизация", "Эксперт 1", HIGH, MEDIUM, 0.6],
+        ["Авторизация", "Эксперт 2", HIGH, HIGH, 0.4],
+    ]
+    rounds = DelphiRounds(kind="it2fs")
+    for k in range(3):
+        report = rounds.ingest_round(_write_round(tmp_path / f"round{k}.csv", base))
+    assert report == {}
+    assert rounds.results()["Авторизация"]["Удобство"]["consensus_round"] == 2
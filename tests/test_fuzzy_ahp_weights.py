@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from prioritization_tool.logic.ahp_hierarchy import AHPHierarchy
+from prioritization_tool.logic.fuzzy_ahp import (
+    WEIGHT_METHODS, UpperTriangularMatrix, criteria_weights, consistency_ratio, compact_consistency_ratio
+)
+
+
+def _crisp_tfn(matrix):
+    matrix = np.asarray(matrix, dtype=float)
+    return np.stack([matrix, matrix, matrix], axis=-1)
+
+
+def _consistent(weights):
+    weights = np.asarray(weights, dtype=float)
+    return weights[:, np.newaxis] / weights[np.newaxis, :]
+
+
+@pytest.mark.parametrize("method", list(WEIGHT_METHODS))
+@pytest.mark.parametrize("n", [2, 3, 6])
+def test_equal_importance_gives_equal_weights(method, n):
+    fuzzy_matrix = np.ones((n, n, 3))
+    expected = np.full(n, 1.0 / n)
+
+    assert np.allclose(criteria_weights(fuzzy_matrix, method), expected)
+    assert np.allclose(criteria_weights(UpperTriangularMatrix.from_full(fuzzy_matrix), method), expected)
+
+
+@pytest.mark.parametrize("method", list(WEIGHT_METHODS))
+def test_tied_rows_get_equal_weights(method):
+    # Критерии A и B равнозначны между собой и одинаково превосходят C
+    fuzzy_matrix = np.array([
+        [[1, 1, 1], [1, 1, 1], [2, 3, 4]],
+        [[1, 1, 1], [1, 1, 1], [2, 3, 4]],
+        [[1 / 4, 1 / 3, 1 / 2], [1 / 4, 1 / 3, 1 / 2], [1, 1, 1]],
+    ])
+    for matrix in (fuzzy_matrix, UpperTriangularMatrix.from_full(fuzzy_matrix)):
+        weights = criteria_weights(matrix, method)
+        assert np.isclose(weights.sum(), 1.0)
+        assert np.isclose(weights[0], weights[1])
+        assert weights[0] > weights[2]
+
+
+@pytest.mark.parametrize("method", ["geometric", "buckley", "eigenvector"])
+def test_consistent_crisp_matrix_recovers_weights(method):
+    expected = np.array([0.4, 0.3, 0.2, 0.1])
+    fuzzy_matrix = _crisp_tfn(_consistent(expected))
+
+    assert np.allclose(criteria_weights(fuzzy_matrix, method), expected)
+    assert np.allclose(criteria_weights(UpperTriangularMatrix.from_full(fuzzy_matrix), method), expected)
+
+
+def test_consistent_crisp_matrix_has_zero_cr():
+    matrix = _consistent([0.4, 0.3, 0.2, 0.1])
+
+    consistency = consistency_ratio(matrix)
+    assert np.isclose(consistency["lambda_max"], 4.0)
+    assert abs(consistency["cr"]) < 1e-9
+
+    compact = compact_consistency_ratio(UpperTriangularMatrix.from_full(_crisp_tfn(matrix)))
+    assert abs(compact["cr"]) < 1e-9
+
+
+def test_hierarchy_chang_with_equal_judgments():
+    hierarchy = AHPHierarchy("Цель", weight_method="chang")
+    for name in ["T1", "T2"]:
+        hierarchy.add_node(name, "Цель")
+    for name in ["R1", "R2"]:
+        hierarchy.add_node(name, "T1")
+    hierarchy.set_judgments("T1", np.ones((2, 2, 3)))
+
+    assert hierarchy.local_weights("T1") == pytest.approx({"R1": 0.5, "R2": 0.5})
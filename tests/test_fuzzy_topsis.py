@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from prioritization_tool.logic.fuzzy_topsis import (
+    calculate_fuzzy_topsis, fuzzy_closeness, parse_fuzzy_scale
+)
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "prioritization_tool", "assets", "Fuzzy TOPSIS example")
+INPUT_PATH = os.path.join(EXAMPLE_DIR, "fuzzy_type1_example.csv")
+SCALE_PATH = os.path.join(EXAMPLE_DIR, "stakeholders_scales_fuzzy_topsis_example.csv")
+
+
+# Эталон — исходная поэлементная реализация нормализации и расстояний
+
+def reference_normalize_fuzzy_matrix(fuzzy_matrix):
+    n_alts, n_criteria = fuzzy_matrix.shape[:2]
+    normalized = np.zeros_like(fuzzy_matrix)
+    for j in range(n_criteria):
+        col_max = np.max(fuzzy_matrix[:, j, 3])
+        for i in range(n_alts):
+            a, b, c, d = fuzzy_matrix[i, j]
+            normalized[i, j] = np.array([a / col_max, b / col_max, c / col_max, d / col_max])
+    return normalized
+
+
+def reference_fuzzy_distance(a, b):
+    return np.sqrt(np.sum((a - b) ** 2) / 4)
+
+
+def reference_closeness(fuzzy_matrix):
+    norm_matrix = reference_normalize_fuzzy_matrix(fuzzy_matrix)
+
+    F_plus = np.max(norm_matrix, axis=0)
+    F_minus = np.min(norm_matrix, axis=0)
+
+    D_plus = np.array([
+        np.sqrt(np.sum([reference_fuzzy_distance(norm_matrix[i, j], F_plus[j]) ** 2
+                        for j in range(norm_matrix.shape[1])]))
+        for i in range(norm_matrix.shape[0])
+    ])
+
+    D_minus = np.array([
+        np.sqrt(np.sum([reference_fuzzy_distance(norm_matrix[i, j], F_minus[j]) ** 2
+                        for j in range(norm_matrix.shape[1])]))
+        for i in range(norm_matrix.shape[0])
+    ])
+
+    return D_minus / (D_plus + D_minus)
+
+
+def reference_example_matrix():
+    df = pd.read_csv(INPUT_PATH)
+    scale = parse_fuzzy_scale(SCALE_PATH)
+    fuzzy_matrix = [[scale[str(row[col]).strip()] for col in df.columns[1:]] for _, row in df.iterrows()]
+    return df["Альтернатива"].tolist(), np.array(fuzzy_matrix)
+
+
+def test_closeness_matches_reference_on_example():
+    alt_names, fuzzy_matrix = reference_example_matrix()
+    expected = reference_closeness(fuzzy_matrix)
+
+    assert np.allclose(fuzzy_closeness(fuzzy_matrix), expected, rtol=0, atol=1e-12)
+
+    results = calculate_fuzzy_topsis(INPUT_PATH, SCALE_PATH)
+    assert list(results) == alt_names
+    assert [results[alt]["score"] for alt in alt_names] == [round(float(c), 4) for c in expected]
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (7, 3), (40, 12)])
+def test_closeness_matches_reference_on_random_tensor(shape):
+    rng = np.random.default_rng(sum(shape))
+    # Трапеции a ≤ b ≤ c ≤ d с положительными значениями
+    fuzzy_matrix = np.sort(rng.uniform(0.5, 10.0, size=shape + (4,)), axis=-1)
+
+    with np.errstate(invalid="ignore"):
+        expected = reference_closeness(fuzzy_matrix)
+        actual = fuzzy_closeness(fuzzy_matrix)
+    assert np.allclose(actual, expected, rtol=0, atol=1e-12, equal_nan=True)
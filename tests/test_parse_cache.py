@@ -0,0 +1,67 @@
+import numpy as np
+
+from prioritization_tool.logic.parse_cache import ParseCache
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_version_is_part_of_key(tmp_path):
+    path = _write(tmp_path / "input.csv", "a,b\n1,2\n")
+    cache = ParseCache(disk_dir=str(tmp_path / "cache"))
+
+    first = cache.get("kind", path, lambda p: {"x": np.array([1])})
+    cached = cache.get("kind", path, lambda p: {"x": np.array([2])})
+    bumped = cache.get("kind", path, lambda p: {"x": np.array([3])}, version=2)
+    assert first["x"][0] == cached["x"][0] == 1
+    assert bumped["x"][0] == 3
+
+    # Дисковый уровень также разделяет версии
+    cold = ParseCache(disk_dir=str(tmp_path / "cache"))
+    assert cold.get("kind", path, lambda p: {"x": np.array([4])})["x"][0] == 1
+    assert cold.get("kind", path, lambda p: {"x": np.array([5])}, version=2)["x"][0] == 3
+
+
+def test_file_change_invalidates_entry(tmp_path):
+    path = _write(tmp_path / "input.csv", "a,b\n1,2\n")
+    cache = ParseCache()
+    assert cache.get("kind", path, lambda p: {"x": np.array([1])})["x"][0] == 1
+
+    _write(tmp_path / "input.csv", "a,b\n1,2\n3,4\n")
+    assert cache.get("kind", path, lambda p: {"x": np.array([2])})["x"][0] == 2
+
+
+def _npz_files(directory):
+    return sorted(name for name in directory.iterdir() if name.suffix == ".npz")
+
+
+def test_disk_keeps_latest_entry_per_source(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = ParseCache(disk_dir=str(cache_dir))
+    path = _write(tmp_path / "input.csv", "a\n1\n")
+    other = _write(tmp_path / "other.csv", "a\n1\n")
+
+    cache.get("kind", other, lambda p: {"x": np.array([0])})
+    for k in range(5):
+        _write(tmp_path / "input.csv", "a\n" + "1\n" * (k + 2))
+        cache.get("kind", path, lambda p: {"x": np.array([k])})
+        cache.get("kind", path, lambda p: {"x": np.array([k])}, version=2)
+
+    # Одна запись на каждый источник (вид, версия, путь)
+    assert len(_npz_files(cache_dir)) == 3
+    cold = ParseCache(disk_dir=str(cache_dir))
+    assert cold.get("kind", path, lambda p: {"x": np.array([-1])})["x"][0] == 4
+
+
+def test_disk_size_is_capped(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = ParseCache(disk_dir=str(cache_dir), max_disk_bytes=3 * 8200)
+    for k in range(6):
+        path = _write(tmp_path / f"input{k}.csv", "a\n1\n")
+        cache.get("kind", path, lambda p: {"x": np.zeros(1000)})
+
+    files = _npz_files(cache_dir)
+    assert sum(f.stat().st_size for f in files) <= 3 * 8200
+    assert 0 < len(files) < 6
@@ -0,0 +1,40 @@
+import numpy as np
+
+from prioritization_tool.logic.row_registry import RowRegistry
+
+
+def _registry():
+    registry = RowRegistry()
+    registry.add_array("sums", (2,))
+    registry.add_array("first", fill=-1, dtype=np.int64)
+    return registry
+
+
+def test_rows_grow_with_fill_values():
+    registry = _registry()
+    assert registry.rows(["b", "a", "b"]).tolist() == [0, 1, 0]
+    registry["sums"][[0, 1]] += [[1.0, 2.0], [3.0, 4.0]]
+
+    # Новые имена порциями: емкость растет удвоением, данные сохраняются
+    for k in range(100):
+        registry.rows([f"x{k}", "a"])
+    assert len(registry) == 102
+    assert registry.names[:3] == ["b", "a", "x0"]
+    assert registry["sums"].shape == (102, 2)
+    assert np.array_equal(registry["sums"][:2], [[1.0, 2.0], [3.0, 4.0]])
+    assert np.all(registry["sums"][2:] == 0)
+    assert np.all(registry["first"] == -1)
+
+
+def test_restore_from_arrays():
+    registry = _registry()
+    registry.rows(["a", "b", "c"])
+    registry["first"] = [5, -1, 7]
+    arrays = registry.to_arrays()
+
+    restored = _registry()
+    restored.restore(arrays)
+    assert restored.names == ["a", "b", "c"]
+    for name, values in restored.to_arrays().items():
+        assert np.array_equal(values, arrays[name])
+        assert values.dtype == arrays[name].dtype